@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 import os
 import glob
+import concurrent.futures
 from colorama import Fore, Style, init
-from configuracion import INPUT_FOLDER, OUTPUT_FOLDER, EXCLUSIONES_FOLDER
+from configuracion import (INPUT_FOLDER, OUTPUT_FOLDER, EXCLUSIONES_FOLDER, CSV_CHUNK_SIZE,
+                           MAX_CONCURRENT_FILES, API_MAX_WORKERS)
 from exclusions import cargar_exclusiones
 from processors.process_csv import process_csv
+from processors.parallel_api import configurar_presupuesto_api, cerrar_presupuesto_api
+from progreso import DiarioProgreso, clave_archivo
 
 init(autoreset=True)
 
@@ -36,6 +40,28 @@ def display_menu():
         else:
             print(Fore.RED + "❌ Opción inválida. Por favor, ingrese '1' o '2'.")
 
+def preguntar_reanudar(diario):
+    """
+    Si el diario tiene progreso de una ejecución anterior, pregunta si se reanuda.
+    Si no se reanuda, el progreso anterior se descarta.
+    """
+    if not diario.hay_progreso():
+        return
+    resumen = diario.resumen()
+    print(Fore.CYAN + f"💾 Hay una ejecución anterior sin terminar: {resumen['archivos_completados']} "
+                      f"archivos publicados y {resumen['filas']} filas enriquecidas.")
+    while True:
+        choice = input(Fore.YELLOW + "¿Reanudarla? (s/n): ").strip().lower()
+        if choice == "s":
+            print(Fore.GREEN + "✅ Se reanuda la ejecución anterior.")
+            return
+        elif choice == "n":
+            diario.reiniciar()
+            print(Fore.BLUE + "🔹 Progreso anterior descartado. Se empieza de cero.")
+            return
+        else:
+            print(Fore.RED + "❌ Opción inválida. Por favor, ingrese 's' o 'n'.")
+
 def ensure_folders_exist():
     """
     Verifica y crea, si no existen, las carpetas requeridas:
@@ -55,7 +81,14 @@ def main():
       2. Carga las palabras de exclusión.
       3. Muestra el menú interactivo (modo completo o demo).
       4. Busca y procesa los archivos CSV en la carpeta '1Inputs'.
-      5. Llama a la función 'process_csv' para cada archivo, pasando la lista de exclusiones y el modo seleccionado.
+      5. Llama a la función 'process_csv' para cada archivo, pasando la lista de exclusiones, el modo seleccionado
+         y el tamaño de bloque (CSV_CHUNK_SIZE) para procesarlo en streaming.
+         Se procesan hasta MAX_CONCURRENT_FILES archivos a la vez y todos comparten un mismo
+         presupuesto de llamadas simultáneas a la API (como máximo API_MAX_WORKERS; el
+         controlador adaptativo ajusta el límite real): mientras un archivo lee, normaliza
+         o escribe, los demás siguen usando la red.
+      6. Anota el progreso en PROGRESS_FILE: si la ejecución se corta, la siguiente puede
+         reanudarla sin repetir los archivos ni las filas ya terminados.
     """
     print(Style.BRIGHT + Fore.CYAN + "============================================================")
     print("🚀 INICIO DEL PROCESAMIENTO DE CSVs 🚀")
@@ -63,6 +96,8 @@ def main():
 
     ensure_folders_exist()
     exclusiones = cargar_exclusiones()
+    diario = DiarioProgreso()
+    preguntar_reanudar(diario)
     display_menu()
 
     csv_files = glob.glob(os.path.join(INPUT_FOLDER, "*.csv"))
@@ -70,8 +105,22 @@ def main():
         print(Fore.RED + f"🚨 No se encontraron archivos CSV en '{INPUT_FOLDER}'.")
         return
 
-    for csv_file in csv_files:
-        process_csv(csv_file, exclusiones, DEMO_MODE)
+    configurar_presupuesto_api(API_MAX_WORKERS)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_FILES, len(csv_files))) as executor:
+            futures = [
+                executor.submit(process_csv, csv_file, exclusiones, DEMO_MODE,
+                                chunk_size=CSV_CHUNK_SIZE, diario=diario)
+                for csv_file in csv_files
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+    finally:
+        cerrar_presupuesto_api()
+
+    # Con todos los archivos publicados, la próxima ejecución empieza de cero
+    if all(diario.archivo_completado(clave_archivo(f), DEMO_MODE) for f in csv_files):
+        diario.reiniciar()
 
     print(Fore.GREEN + "🎉 Procesamiento completado. Revisa los archivos en la carpeta de salida.")
 
@@ -1,11 +1,22 @@
 #!/usr/bin/env python3
+import glob
 import os
+from collections import Counter
 import pandas as pd
 from colorama import Fore
 from openpyxl import Workbook
 
-# Importamos la función que normaliza direcciones
-from normalizador_direcciones import parse_address_by_country
+# pyarrow es opcional: sin él no se genera la salida Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Importamos la función que normaliza direcciones (por columnas)
+from normalizador_direcciones import normalizar_direcciones_df, ADDRESS_COLUMNS
+from configuracion import PARQUET_OUTPUT, PARQUET_FOLDER
 
 # -------------------------------------------------------------
 # ORDEN DE COLUMNAS PARA AMBAS VERSIONES (COMPLETA Y DEMO)
@@ -20,6 +31,14 @@ COLUMN_ORDER = [
     "closed_on", "can_claim", "link", "id"
 ]
 
+# Columnas que se ocultan ("***") en la versión DEMO
+DEMO_MASKED_COLUMNS = ["phone", "Emails", "website"]
+
+# Máximo de filas de datos que admite una hoja de Excel (sin contar la cabecera)
+EXCEL_MAX_ROWS = 1048575
+# Filas que se convierten a la vez al escribir la hoja "Data"
+EXCEL_WRITE_CHUNK_SIZE = 10000
+
 # -------------------------------------------------------------
 # TEXTO LEGAL O COPYRIGHT PARA LA PESTAÑA CORRESPONDIENTE
 # -------------------------------------------------------------
@@ -45,6 +64,45 @@ COPYRIGHT_TEXT = [
     "The data has been collected from public sources and complies with current regulations."
 ]
 
+# Métricas de la pestaña "Statistics", en orden
+STATISTICS_METRICS = ["Number of companies", "Number of phones", "Number of emails"]
+
+def _no_vacios(serie: pd.Series) -> pd.Series:
+    """Máscara de celdas con valor (ni NaN ni texto en blanco)."""
+    return serie.notna() & serie.astype("string").str.strip().ne("").fillna(False)
+
+def contar_metricas(df: pd.DataFrame) -> dict:
+    """
+    Calcula de una vez, en forma vectorizada, las métricas de "Statistics"
+    para la versión completa y para la demo (que se deducen de los mismos datos):
+      - Number of companies: filas.
+      - Number of phones: teléfonos con valor (en la demo, todo lo que queda como "***").
+      - Number of emails: emails separados por comas (en la demo, cada "***" cuenta uno).
+
+    Retorna {"completo": {métrica: valor}, "demo": {métrica: valor}}.
+    """
+    num_companies = len(df)
+    phones = phones_demo = emails = emails_demo = 0
+    if "phone" in df.columns:
+        phones = int(_no_vacios(df["phone"]).sum())
+        phones_demo = int(df["phone"].notna().sum())
+    if "Emails" in df.columns:
+        valores = df["Emails"].dropna().astype("string")
+        # Cada tramo entre comas con algún carácter que no sea espacio es un email
+        emails = int(valores.str.count(r"[^,]*[^,\s]").sum())
+        emails_demo = len(valores)
+    return {
+        "completo": dict(zip(STATISTICS_METRICS, [num_companies, phones, emails])),
+        "demo": dict(zip(STATISTICS_METRICS, [num_companies, phones_demo, emails_demo])),
+    }
+
+def tabla_estadisticas(metricas: dict) -> pd.DataFrame:
+    """DataFrame 'Metric'/'Value' de la pestaña "Statistics" a partir de {métrica: valor}."""
+    return pd.DataFrame({
+        "Metric": STATISTICS_METRICS,
+        "Value": [int(metricas.get(metrica, 0)) for metrica in STATISTICS_METRICS]
+    })
+
 def generate_statistics_en(df: pd.DataFrame) -> pd.DataFrame:
     """
     Crea un DataFrame con estadísticas en inglés:
@@ -52,34 +110,15 @@ def generate_statistics_en(df: pd.DataFrame) -> pd.DataFrame:
       - Number of phones
       - Number of emails
     """
-    num_companies = len(df)
+    return tabla_estadisticas(contar_metricas(df)["completo"])
 
-    num_phones = 0
-    if "phone" in df.columns:
-        num_phones = (
-            df["phone"].astype(str).str.strip()
-            .replace("", pd.NA).dropna().shape[0]
-        )
-
-    total_emails = 0
-    if "Emails" in df.columns:
-        for val in df["Emails"].dropna():
-            splitted = [email.strip() for email in str(val).split(",") if email.strip()]
-            total_emails += len(splitted)
-
-    data = {
-        "Metric": [
-            "Number of companies",
-            "Number of phones",
-            "Number of emails"
-        ],
-        "Value": [
-            num_companies,
-            num_phones,
-            total_emails
-        ]
-    }
-    return pd.DataFrame(data)
+def contar_sectores(df: pd.DataFrame) -> pd.Series:
+    """Empresas por 'main_category' (de mayor a menor). Es igual en la versión completa y la demo."""
+    if "main_category" not in df.columns:
+        return pd.Series(dtype="int64")
+    counts = df["main_category"].value_counts()
+    # Con dtype 'category' aparecen también las categorías sin filas
+    return counts[counts > 0]
 
 def generate_sectors_df(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -89,66 +128,73 @@ def generate_sectors_df(df: pd.DataFrame) -> pd.DataFrame:
     if "main_category" not in df.columns:
         return pd.DataFrame({"Sector": [], "Count": []})
 
-    counts = df["main_category"].dropna().value_counts()
-    sectors_df = counts.reset_index()
+    sectors_df = contar_sectores(df).reset_index()
     sectors_df.columns = ["Sector", "Count"]
     return sectors_df
 
-def anonymize_data(value):
+def vista_demo(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Anonimiza datos en columnas sensibles (phone, Emails, website).
+    Versión DEMO de un DataFrame: DEMO_MASKED_COLUMNS con "***" donde hay valor.
+    Solo se crean las columnas ocultadas; el resto se comparte con 'df' (sin copiarlo).
     """
-    return "***" if pd.notna(value) else value
+    demo_df = df.copy(deep=False)
+    for col in DEMO_MASKED_COLUMNS:
+        if col in demo_df.columns:
+            demo_df[col] = df[col].mask(df[col].notna(), "***")
+    return demo_df
 
 def crear_version_demo(original_df: pd.DataFrame, csv_output_file: str, base_name: str):
     """
-    Crea la VERSIÓN DEMO del DataFrame (CSV y Excel con 4 pestañas).
-    1. Anonimiza phone, Emails, website.
-    2. Mantiene o no las direcciones (depende de si deseas anonimizar 'address' o 'street').
+    Crea la VERSIÓN DEMO del DataFrame en CSV.
+    1. Anonimiza phone, Emails, website (ver vista_demo).
+    2. Mantiene las direcciones (añade 'address' o 'street' a DEMO_MASKED_COLUMNS para ocultarlas).
     3. Reemplaza '-CentralCompanies' por '-CentralDemo' en el nombre de salida.
-    """
-    demo_df = original_df.copy()
-
-    # Anonimizar columnas sensibles
-    for col in ["phone", "Emails", "website"]:
-        if col in demo_df.columns:
-            demo_df[col] = demo_df[col].apply(anonymize_data)
-
-    # (Opcional) anonimizar address/street si también quieres ocultar direcciones
-    # for col in ["address", "street"]:
-    #     if col in demo_df.columns:
-    #         demo_df[col] = demo_df[col].apply(anonymize_data)
+    El Excel DEMO se escribe junto al completo con EscritorExcel (una sola pasada).
 
+    Retorna (ruta CSV demo, ruta Excel demo).
+    """
     demo_csv_path = csv_output_file.replace("-CentralCompanies", "-CentralDemo")
     demo_excel_path = demo_csv_path.replace(".csv", ".xlsx")
 
-    # Generar DataFrames auxiliares
-    stats_demo = generate_statistics_en(demo_df)
-    sectors_demo = generate_sectors_df(demo_df)
-    copyright_df = pd.DataFrame({
-        "Copyright": COPYRIGHT_TEXT
-    })
-
     # Guardar CSV DEMO
-    demo_df.to_csv(demo_csv_path, index=False)
+    vista_demo(original_df).to_csv(demo_csv_path, index=False)
     print(Fore.GREEN + f"Versión DEMO (CSV): {demo_csv_path}")
 
-    # Guardar Excel DEMO
-    with pd.ExcelWriter(demo_excel_path, engine="openpyxl") as writer:
-        demo_df.to_excel(writer, sheet_name="Data", index=False)
-        stats_demo.to_excel(writer, sheet_name="Statistics", index=False)
-        sectors_demo.to_excel(writer, sheet_name="Sectors", index=False)
-        copyright_df.to_excel(writer, sheet_name="Copyright", index=False)
-
-    print(Fore.GREEN + f"Versión DEMO (Excel): {demo_excel_path}")
     return demo_csv_path, demo_excel_path
 
+def preparar_dataframe(df: pd.DataFrame, country_initials: str, columnas=None) -> pd.DataFrame:
+    """
+    Deja un DataFrame (completo o un bloque) listo para publicar:
+      - Elimina 'query' y renombra 'place_id' a 'id'.
+      - Normaliza 'address' en street, postal_code, locality, province y country.
+      - Reordena según COLUMN_ORDER (o según 'columnas', si se indican).
+    """
+    # Eliminar columnas que no queremos
+    if "query" in df.columns:
+        df.drop(columns=["query"], inplace=True, errors="ignore")
+    if "place_id" in df.columns:
+        df.rename(columns={"place_id": "id"}, inplace=True)
+
+    # Normalizar direcciones si existe la columna 'address'
+    if "address" in df.columns:
+        # Patrones conocidos en bloque; solo las filas que no encajan van al camino lento
+        parsed_info = normalizar_direcciones_df(df["address"], country_initials)
+        # street, postal_code, locality, province y country (el country_code)
+        for col in ADDRESS_COLUMNS:
+            df[col] = parsed_info[col]
+
+    # Reordenar columnas
+    if columnas is None:
+        columnas = [col for col in COLUMN_ORDER if col in df.columns]
+    return df.reindex(columns=columnas, fill_value="")
+
 def guardar_archivos_finales(df: pd.DataFrame, base_name: str, output_folder: str) -> dict:
     """
     Genera:
       1) Versión COMPLETA (CSV y Excel con 4 pestañas)
       2) Versión DEMO (CSV y Excel con 4 pestañas), anonimizando phone/Emails/website
-    EN ADEMÁS: Normaliza la dirección con 'parse_address_by_country' (de normalizador_direcciones)
+      3) Dataset Parquet de la versión completa, particionado por país y sector (si hay pyarrow)
+    EN ADEMÁS: Normaliza la dirección con 'normalizar_direcciones_df' (de normalizador_direcciones)
     para obtener columnas: street, postal_code, locality, province, country.
 
     Retorna un dict con las rutas:
@@ -156,36 +202,18 @@ def guardar_archivos_finales(df: pd.DataFrame, base_name: str, output_folder: st
         "csv_completo":  <ruta CSV completo>,
         "excel_completo": <ruta Excel completo>,
         "demo_csv": <ruta CSV demo>,
-        "demo_excel": <ruta Excel demo>
+        "demo_excel": <ruta Excel demo>,
+        "parquet": <carpeta del dataset Parquet, o None>
       }
     """
-    from normalizador_direcciones import parse_address_by_country
-
     # Crear subcarpeta según el prefijo de país
     country_initials = base_name.split("-")[0].upper()
     country_folder = os.path.join(output_folder, country_initials)
     os.makedirs(country_folder, exist_ok=True)
     print(Fore.YELLOW + f"Carpeta para país '{country_initials}': {country_folder}")
 
-    # Eliminar columnas que no queremos
-    if "query" in df.columns:
-        df.drop(columns=["query"], inplace=True, errors="ignore")
-    if "place_id" in df.columns:
-        df.rename(columns={"place_id": "id"}, inplace=True)
-
-    # Normalizar direcciones si existe la columna 'address'
-    if "address" in df.columns:
-        # Llamamos a parse_address_by_country para cada valor
-        parsed_info = df["address"].apply(lambda x: parse_address_by_country(x, country_initials))
-        df["street"]      = parsed_info.apply(lambda x: x[0])
-        df["postal_code"] = parsed_info.apply(lambda x: x[1])
-        df["locality"]    = parsed_info.apply(lambda x: x[2])
-        df["province"]    = parsed_info.apply(lambda x: x[3])
-        # El quinto valor es el country_code, lo guardamos en 'country'
-        df["country"]     = parsed_info.apply(lambda x: x[4])
-
-    # Reordenar columnas
-    df = df.reindex(columns=[col for col in COLUMN_ORDER if col in df.columns], fill_value="")
+    # Limpiar, normalizar direcciones y reordenar columnas
+    df = preparar_dataframe(df, country_initials)
 
     # Rutas de salida
     csv_output_file = os.path.join(country_folder, f"{base_name}-CentralCompanies.csv")
@@ -195,28 +223,279 @@ def guardar_archivos_finales(df: pd.DataFrame, base_name: str, output_folder: st
     df.to_csv(csv_output_file, index=False)
     print(Fore.GREEN + f"CSV COMPLETO: {csv_output_file}")
 
-    # Construir DataFrames auxiliares
-    stats_df = generate_statistics_en(df)
-    sectors_df = generate_sectors_df(df)
-    copyright_df = pd.DataFrame({
-        "Copyright": COPYRIGHT_TEXT
-    })
+    # CREAR VERSIÓN DEMO (CSV)
+    demo_csv, demo_excel = crear_version_demo(df, csv_output_file, base_name)
 
-    # GUARDAR EXCEL COMPLETO
-    with pd.ExcelWriter(excel_output_file, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name="Data", index=False)
-        stats_df.to_excel(writer, sheet_name="Statistics", index=False)
-        sectors_df.to_excel(writer, sheet_name="Sectors", index=False)
-        copyright_df.to_excel(writer, sheet_name="Copyright", index=False)
+    # Estadísticas y sectores, calculados una vez para ambas versiones
+    metricas = contar_metricas(df)
+    sectors_df = generate_sectors_df(df)
 
+    # GUARDAR EXCEL COMPLETO Y DEMO en una sola pasada sobre los datos
+    escritor = EscritorExcel(excel_output_file, demo_excel)
+    escritor.agregar(df)
+    escritor.cerrar(tabla_estadisticas(metricas["completo"]), tabla_estadisticas(metricas["demo"]), sectors_df)
     print(Fore.GREEN + f"EXCEL COMPLETO: {excel_output_file}")
+    print(Fore.GREEN + f"Versión DEMO (Excel): {demo_excel}")
 
-    # CREAR VERSIÓN DEMO
-    demo_csv, demo_excel = crear_version_demo(df, csv_output_file, base_name)
+    # GUARDAR PARQUET (particionado por país y sector)
+    parquet = EscritorParquet(base_name, output_folder, country_initials)
+    parquet.agregar(df)
 
     return {
         "csv_completo": csv_output_file,
         "excel_completo": excel_output_file,
         "demo_csv": demo_csv,
-        "demo_excel": demo_excel
+        "demo_excel": demo_excel,
+        "parquet": parquet.finalizar()
     }
+
+# -------------------------------------------------------------
+# ESCRITURA DE LOS EXCEL (COMPLETO Y DEMO)
+# -------------------------------------------------------------
+class EscritorExcel:
+    """
+    Escribe los Excel completo y demo (4 pestañas) en una sola pasada:
+      - agregar(bloque): añade las filas del bloque (versión completa) a la hoja
+        "Data" de ambos libros; en el demo se ocultan DEMO_MASKED_COLUMNS.
+        Se puede llamar varias veces, una por bloque.
+      - cerrar(stats_completo, stats_demo, sectors_df): añade "Statistics",
+        "Sectors" y "Copyright" y guarda los dos archivos.
+    Los libros de openpyxl van en modo 'write_only': cada fila se vuelca al
+    archivo temporal de la hoja al añadirla, así que la memoria no depende
+    del número de filas.
+    """
+
+    def __init__(self, excel_path: str, demo_excel_path: str):
+        self.rutas = {"completo": excel_path, "demo": demo_excel_path}
+        self.libros = {version: Workbook(write_only=True) for version in self.rutas}
+        self.hojas = {version: libro.create_sheet("Data") for version, libro in self.libros.items()}
+        self.columnas = None
+        self._ocultas = []
+        self.filas = 0
+        self.truncado = False
+
+    def agregar(self, bloque: pd.DataFrame):
+        """Añade las filas de un bloque (ya preparado, versión completa) a ambos libros."""
+        if self.columnas is None:
+            # Las columnas del primer bloque fijan la cabecera
+            self.columnas = list(bloque.columns)
+            self._ocultas = [i for i, col in enumerate(self.columnas) if col in DEMO_MASKED_COLUMNS]
+            for hoja in self.hojas.values():
+                hoja.append(self.columnas)
+        if self.truncado:
+            return
+
+        completo, demo = self.hojas["completo"], self.hojas["demo"]
+        # Por tramos, para no duplicar en memoria un DataFrame grande al convertirlo
+        for inicio in range(0, len(bloque), EXCEL_WRITE_CHUNK_SIZE):
+            tramo = bloque.iloc[inicio:inicio + EXCEL_WRITE_CHUNK_SIZE]
+            valores = tramo.astype(object).where(tramo.notna(), None)
+            for fila in valores.itertuples(index=False, name=None):
+                if self.filas >= EXCEL_MAX_ROWS:
+                    self.truncado = True
+                    print(Fore.RED + f"⚠ {self.rutas['completo']}: el Excel admite {EXCEL_MAX_ROWS} filas; "
+                                     f"el resto solo está en el CSV.")
+                    return
+                fila = list(fila)
+                completo.append(fila)
+                for i in self._ocultas:
+                    if fila[i] is not None:
+                        fila[i] = "***"
+                demo.append(fila)
+                self.filas += 1
+
+    def cerrar(self, stats_completo: pd.DataFrame, stats_demo: pd.DataFrame, sectors_df: pd.DataFrame):
+        """Añade las pestañas auxiliares y guarda los dos Excel."""
+        copyright_df = pd.DataFrame({"Copyright": COPYRIGHT_TEXT})
+        for version, stats_df in [("completo", stats_completo), ("demo", stats_demo)]:
+            libro = self.libros[version]
+            for nombre, tabla in [("Statistics", stats_df), ("Sectors", sectors_df),
+                                  ("Copyright", copyright_df)]:
+                hoja = libro.create_sheet(nombre)
+                hoja.append(list(tabla.columns))
+                for fila in tabla.itertuples(index=False, name=None):
+                    hoja.append(list(fila))
+            libro.save(self.rutas[version])
+
+
+# -------------------------------------------------------------
+# SALIDA COLUMNAR (PARQUET)
+# -------------------------------------------------------------
+# Tipos de las columnas en Parquet; el resto se guardan como texto
+PARQUET_FLOAT_COLUMNS = ["rating"]
+PARQUET_INT_COLUMNS = ["reviews"]
+PARQUET_BOOL_COLUMNS = ["is_spending_on_ads", "is_temporarily_closed", "can_claim"]
+PARQUET_COMPRESSION = "zstd"
+# Claves de partición (formato Hive: <clave>=<valor>/). 'country_initials' es el
+# prefijo de país del archivo (la carpeta de Publicar); 'country' ya es una columna de datos.
+PARQUET_PARTITION_COLUMNS = ["country_initials", "main_category"]
+# Mínimo de particiones por escritura (el valor por defecto de pyarrow); se amplía si el bloque tiene más
+PARQUET_MAX_PARTITIONS = 1024
+
+_VALORES_BOOL = {"true": True, "false": False, "1": True, "0": False,
+                 "yes": True, "no": False, "sí": True, "si": True}
+
+
+def tipar_para_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte las columnas a tipos con nulos explícitos para guardarlas en Parquet:
+    números (Float64/Int64), booleanos ('boolean') y texto ('string').
+    Los valores que no encajan en su tipo quedan como nulos.
+    """
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        if col in PARQUET_FLOAT_COLUMNS:
+            columnas[col] = pd.to_numeric(serie, errors="coerce").astype("Float64")
+        elif col in PARQUET_INT_COLUMNS:
+            numeros = pd.to_numeric(serie, errors="coerce")
+            columnas[col] = numeros.where(numeros == numeros.round()).astype("Int64")
+        elif col in PARQUET_BOOL_COLUMNS:
+            texto = serie.astype("string").str.strip().str.lower()
+            columnas[col] = texto.map(_VALORES_BOOL).astype("boolean")
+        else:
+            columnas[col] = serie.astype("string").replace("", pd.NA)
+    return pd.DataFrame(columnas, index=df.index)
+
+
+class EscritorParquet:
+    """
+    Escribe los datos publicados (versión completa) en un dataset Parquet común
+    a todos los archivos, particionado por país y sector:
+
+        <output_folder>/<PARQUET_FOLDER>/country_initials=ES/main_category=Hotel/<base_name>.part-0-0.parquet
+
+    Con compresión PARQUET_COMPRESSION y tipos propios (ver tipar_para_parquet),
+    de modo que se puede leer solo por columnas y particiones, p. ej.:
+        pyarrow.dataset.dataset("Publicar/parquet", partitioning="hive")
+    Al crearlo se borran las partes anteriores del mismo archivo de entrada.
+    Si pyarrow no está instalado (o PARQUET_OUTPUT es False) no hace nada.
+    """
+
+    def __init__(self, base_name: str, output_folder: str, country_initials: str):
+        self.base_name = base_name
+        self.country_initials = country_initials
+        self.ruta = os.path.join(output_folder, PARQUET_FOLDER)
+        self.activo = PARQUET_OUTPUT and PYARROW_AVAILABLE
+        self.partes = 0
+        if PARQUET_OUTPUT and not PYARROW_AVAILABLE:
+            print(Fore.YELLOW + "⚠ pyarrow no está instalado: se omite la salida Parquet.")
+        if not self.activo:
+            return
+
+        patron = os.path.join(self.ruta, f"country_initials={glob.escape(country_initials)}", "*",
+                              f"{glob.escape(base_name)}.part-*.parquet")
+        for anterior in glob.glob(patron):
+            os.remove(anterior)
+
+    def agregar(self, bloque: pd.DataFrame):
+        """Añade un bloque (ya preparado, versión completa) al dataset."""
+        if not self.activo or bloque.empty:
+            return
+        datos = tipar_para_parquet(bloque)
+        datos["country_initials"] = self.country_initials
+        if "main_category" not in datos.columns:
+            datos["main_category"] = pd.Series(pd.NA, index=datos.index, dtype="string")
+        tabla = pa.Table.from_pandas(datos, preserve_index=False)
+
+        particiones = ds.partitioning(
+            pa.schema([(col, pa.string()) for col in PARQUET_PARTITION_COLUMNS]), flavor="hive"
+        )
+        # write_dataset falla si el bloque tiene más de max_partitions particiones (1024 por defecto)
+        num_particiones = len(datos[PARQUET_PARTITION_COLUMNS].drop_duplicates())
+        ds.write_dataset(
+            tabla, self.ruta, format="parquet", partitioning=particiones,
+            basename_template=f"{self.base_name}.part-{self.partes}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            max_partitions=max(PARQUET_MAX_PARTITIONS, num_particiones),
+            file_options=ds.ParquetFileFormat().make_write_options(compression=PARQUET_COMPRESSION),
+        )
+        self.partes += 1
+
+    def finalizar(self):
+        """Ruta del dataset, o None si no se ha escrito."""
+        if not self.activo or not self.partes:
+            return None
+        print(Fore.GREEN + f"PARQUET: {self.ruta} (country_initials={self.country_initials})")
+        return self.ruta
+
+
+# -------------------------------------------------------------
+# PUBLICACIÓN INCREMENTAL (MODO STREAMING POR BLOQUES)
+# -------------------------------------------------------------
+class PublicacionIncremental:
+    """
+    Publica un archivo bloque a bloque, sin tener todo el DataFrame en memoria:
+      - agregar(bloque): prepara el bloque (ver preparar_dataframe) y lo añade
+        a los CSV y a los Excel completo y demo, y al dataset Parquet;
+        acumula estadísticas y sectores.
+      - finalizar(): cierra los Excel con las pestañas auxiliares y devuelve
+        las mismas rutas que guardar_archivos_finales.
+    """
+
+    def __init__(self, base_name: str, output_folder: str):
+        self.base_name = base_name
+        self.country_initials = base_name.split("-")[0].upper()
+        self.country_folder = os.path.join(output_folder, self.country_initials)
+        os.makedirs(self.country_folder, exist_ok=True)
+        print(Fore.YELLOW + f"Carpeta para país '{self.country_initials}': {self.country_folder}")
+
+        self.csv_output_file = os.path.join(self.country_folder, f"{base_name}-CentralCompanies.csv")
+        self.excel_output_file = self.csv_output_file.replace(".csv", ".xlsx")
+        self.demo_csv_path = self.csv_output_file.replace("-CentralCompanies", "-CentralDemo")
+        self.demo_excel_path = self.demo_csv_path.replace(".csv", ".xlsx")
+
+        self.columnas = None
+        self.excel = EscritorExcel(self.excel_output_file, self.demo_excel_path)
+        self.parquet = EscritorParquet(base_name, output_folder, self.country_initials)
+        # Totales acumulados de "Statistics" para la versión completa y la demo
+        self.totales = {"completo": Counter(), "demo": Counter()}
+        self.sectores = Counter()
+
+    def agregar(self, bloque: pd.DataFrame):
+        """Añade un bloque ya enriquecido a las salidas CSV y Excel."""
+        bloque = preparar_dataframe(bloque, self.country_initials, self.columnas)
+        primero = self.columnas is None
+        if primero:
+            # Las columnas del primer bloque fijan la cabecera de todo el archivo
+            self.columnas = list(bloque.columns)
+
+        modo = "w" if primero else "a"
+        bloque.to_csv(self.csv_output_file, mode=modo, header=primero, index=False)
+
+        self.excel.agregar(bloque)
+        self.parquet.agregar(bloque)
+
+        vista_demo(bloque).to_csv(self.demo_csv_path, mode=modo, header=primero, index=False)
+
+        # Estadísticas y sectores acumulados (los mismos que en guardar_archivos_finales)
+        for version, metricas in contar_metricas(bloque).items():
+            self.totales[version].update(metricas)
+        self.sectores.update(contar_sectores(bloque).to_dict())
+
+    def estadisticas(self, version="completo") -> pd.DataFrame:
+        return tabla_estadisticas(self.totales[version])
+
+    def sectores_df(self) -> pd.DataFrame:
+        return pd.DataFrame(self.sectores.most_common(), columns=["Sector", "Count"])
+
+    def finalizar(self) -> dict:
+        """Genera los Excel completo y demo y devuelve las rutas de salida."""
+        if self.columnas is None:
+            print(Fore.RED + f"🚨 No se recibió ningún bloque para {self.base_name}.")
+            return {}
+
+        print(Fore.GREEN + f"CSV COMPLETO: {self.csv_output_file}")
+        print(Fore.GREEN + f"Versión DEMO (CSV): {self.demo_csv_path}")
+
+        self.excel.cerrar(self.estadisticas(), self.estadisticas("demo"), self.sectores_df())
+        print(Fore.GREEN + f"EXCEL COMPLETO: {self.excel_output_file}")
+        print(Fore.GREEN + f"Versión DEMO (Excel): {self.demo_excel_path}")
+
+        return {
+            "csv_completo": self.csv_output_file,
+            "excel_completo": self.excel_output_file,
+            "demo_csv": self.demo_csv_path,
+            "demo_excel": self.demo_excel_path,
+            "parquet": self.parquet.finalizar()
+        }
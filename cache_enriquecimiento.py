@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+cache_enriquecimiento.py
+
+Caché de las respuestas de la API PHP (emails y redes sociales) por dominio.
+
+La misma web aparece en muchas filas y en muchos CSV (cadenas hoteleras,
+franquicias, agencias que comparten web...), así que la respuesta se guarda
+por dominio canónico y se reutiliza entre filas, archivos y ejecuciones
+(en plataformas compartidas como facebook.com la clave incluye la ruta,
+ver dominio_canonico):
+  - respuestas con datos: se guardan ENRICHMENT_TTL segundos,
+  - respuestas vacías (sin emails ni redes): ENRICHMENT_EMPTY_TTL segundos,
+  - errores de la API: no se guardan.
+Las consultas simultáneas del mismo dominio se agrupan en una sola llamada.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+from configuracion import ENRICHMENT_CACHE_FILE
+from crawler import clean_url
+
+ENRICHMENT_TTL = 30 * 24 * 3600        # respuestas con datos: 30 días
+ENRICHMENT_EMPTY_TTL = 7 * 24 * 3600   # respuestas sin emails ni redes: 7 días
+SQLITE_COMMIT_EVERY = 50
+
+
+# Plataformas donde muchos negocios comparten el mismo host y cada uno tiene su ruta
+# (facebook.com/hotelA, sites.google.com/view/...): en ellas la clave incluye la ruta.
+# Cubre también sus subdominios (m.facebook.com, es.linkedin.com...).
+SHARED_PLATFORM_HOSTS = (
+    "facebook.com", "fb.com", "instagram.com", "twitter.com", "x.com", "linkedin.com",
+    "tiktok.com", "youtube.com", "pinterest.com", "google.com", "linktr.ee", "wa.me",
+    "whatsapp.com", "booking.com", "airbnb.com", "airbnb.es", "airbnb.it",
+    "tripadvisor.com", "tripadvisor.es", "tripadvisor.it", "tripadvisor.pt",
+    "wixsite.com", "bit.ly", "goo.gl",
+)
+
+
+def es_plataforma_compartida(host):
+    """True si 'host' (en minúsculas, sin 'www.') es de SHARED_PLATFORM_HOSTS o un subdominio suyo."""
+    return any(host == plataforma or host.endswith("." + plataforma) for plataforma in SHARED_PLATFORM_HOSTS)
+
+
+def dominio_canonico(website):
+    """
+    Clave de caché de un website: el hostname en minúsculas y sin 'www.'
+    ("https://WWW.Hotel.es/contacto" -> "hotel.es"). None si no es una URL válida.
+    En las plataformas compartidas (SHARED_PLATFORM_HOSTS) la clave es host + ruta
+    ("facebook.com/hotelA"), salvo que la ruta esté vacía o sea '/'.
+    """
+    if not isinstance(website, str):
+        return None
+    url = clean_url(website)
+    if not url:
+        return None
+    parsed = urlparse(url)
+    host = parsed.hostname
+    if not host:
+        return None
+    host = host.lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if es_plataforma_compartida(host):
+        ruta = parsed.path.rstrip("/")
+        if parsed.query:
+            ruta += "?" + parsed.query
+        if ruta:
+            return host + ruta
+    return host
+
+
+def respuesta_vacia(respuesta):
+    """True si la API respondió bien pero sin emails ni redes sociales."""
+    return not respuesta.get("emails") and not any(respuesta.get("social_links", {}).values())
+
+
+class CacheEnriquecimiento:
+    """
+    Caché en memoria + SQLite de las respuestas de la API, con agrupación
+    de las consultas simultáneas del mismo dominio. Segura entre hilos.
+    """
+
+    def __init__(self, ruta=ENRICHMENT_CACHE_FILE, ttl=ENRICHMENT_TTL, empty_ttl=ENRICHMENT_EMPTY_TTL):
+        self.ruta = ruta
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        self._lock = threading.Lock()
+        self._entradas = {}   # dominio -> (respuesta, expira)
+        self._en_curso = {}   # dominio -> {"evento": Event, "respuesta": ...} de la consulta en curso
+        self._conexion = None
+        self._pendientes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errores = 0
+        if ruta:
+            self._abrir_sqlite()
+
+    def _abrir_sqlite(self):
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS enrichment_cache (dominio TEXT PRIMARY KEY, respuesta TEXT, expira REAL)"
+        )
+        self._conexion.execute("DELETE FROM enrichment_cache WHERE expira <= ?", (time.time(),))
+        self._conexion.commit()
+        for dominio, respuesta, expira in self._conexion.execute(
+                "SELECT dominio, respuesta, expira FROM enrichment_cache"):
+            self._entradas[dominio] = (json.loads(respuesta), expira)
+        atexit.register(self.guardar)
+
+    def _vigente(self, dominio):
+        # Se llama con el lock tomado
+        entrada = self._entradas.get(dominio)
+        if entrada and entrada[1] > time.time():
+            return entrada[0]
+        return None
+
+    def _guardar_respuesta(self, dominio, respuesta):
+        # Se llama con el lock tomado
+        ttl = self.empty_ttl if respuesta_vacia(respuesta) else self.ttl
+        expira = time.time() + ttl
+        self._entradas[dominio] = (respuesta, expira)
+        if self._conexion is not None:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO enrichment_cache (dominio, respuesta, expira) VALUES (?, ?, ?)",
+                (dominio, json.dumps(respuesta, ensure_ascii=False), expira)
+            )
+            self._pendientes += 1
+            if self._pendientes >= SQLITE_COMMIT_EVERY:
+                self._conexion.commit()
+                self._pendientes = 0
+
+    def obtener(self, website, llamar):
+        """
+        Devuelve la respuesta de la API para 'website', usando la caché si hay
+        una entrada vigente. 'llamar' es la función que consulta la API
+        (p. ej. call_api_php) y solo se invoca en los fallos de caché.
+        """
+        dominio = dominio_canonico(website)
+        if dominio is None:
+            return llamar(website)
+
+        with self._lock:
+            respuesta = self._vigente(dominio)
+            if respuesta is not None:
+                self.hits += 1
+                return respuesta
+            en_curso = self._en_curso.get(dominio)
+            if en_curso is None:
+                en_curso = {"evento": threading.Event(), "respuesta": None}
+                self._en_curso[dominio] = en_curso
+                self.misses += 1
+                propietario = True
+            else:
+                self.coalesced += 1
+                propietario = False
+
+        if not propietario:
+            # Otro hilo ya está consultando este dominio: se usa su respuesta
+            en_curso["evento"].wait()
+            return en_curso["respuesta"]
+
+        respuesta = {"error": True, "fallo_cliente": "interrumpida", "message": "Consulta interrumpida"}
+        try:
+            respuesta = llamar(website)
+            with self._lock:
+                if respuesta.get("error"):
+                    self.errores += 1
+                else:
+                    self._guardar_respuesta(dominio, respuesta)
+            return respuesta
+        finally:
+            en_curso["respuesta"] = respuesta
+            with self._lock:
+                self._en_curso.pop(dominio, None)
+            en_curso["evento"].set()
+
+    def buscar(self, website):
+        """
+        Respuesta vigente en caché para 'website', o None (cuenta como fallo).
+        Para quien consulta la API por su cuenta (p. ej. en lotes) y luego llama a almacenar.
+        """
+        dominio = dominio_canonico(website)
+        with self._lock:
+            respuesta = self._vigente(dominio) if dominio is not None else None
+            if respuesta is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return respuesta
+
+    def almacenar(self, website, respuesta):
+        """Guarda la respuesta de la API para 'website' (los errores no se guardan)."""
+        dominio = dominio_canonico(website)
+        if dominio is None:
+            return
+        with self._lock:
+            if respuesta.get("error"):
+                self.errores += 1
+            else:
+                self._guardar_respuesta(dominio, respuesta)
+
+    def guardar(self):
+        """Confirma en disco las entradas pendientes."""
+        with self._lock:
+            if self._conexion is not None and self._pendientes:
+                self._conexion.commit()
+                self._pendientes = 0
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "errors": self.errores,
+                "entries": len(self._entradas),
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def obtener_cache_enriquecimiento():
+    """Caché de enriquecimiento compartida por el proceso (se crea en el primer uso)."""
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = CacheEnriquecimiento()
+    return _CACHE
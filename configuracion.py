@@ -3,4 +3,24 @@
 INPUT_FOLDER = "1Inputs"
 OUTPUT_FOLDER = "Publicar"
 EXCLUSIONES_FOLDER = "xclusiones"
-PROGRESS_FILE = "progress_state.json"
+PROGRESS_FILE = "progress_state.jsonl"  # diario JSON Lines (ver progreso.py)
+DNS_CACHE_FILE = "dns_cache.sqlite"
+GEOCODING_CACHE_FILE = "geocoding_cache.sqlite"
+# Filas por bloque al procesar un CSV en streaming (None = leer el archivo completo)
+CSV_CHUNK_SIZE = 50000
+ENRICHMENT_CACHE_FILE = "enrichment_cache.sqlite"
+# Archivos CSV que se procesan a la vez
+MAX_CONCURRENT_FILES = 4
+# Llamadas simultáneas a la API, en total, entre todos los archivos en curso.
+# El límite real lo ajusta solo el controlador adaptativo entre el mínimo y el máximo
+# (ver processors/concurrencia_adaptativa.py), empezando por API_INITIAL_WORKERS.
+API_MIN_WORKERS = 2
+API_INITIAL_WORKERS = 10
+API_MAX_WORKERS = 50
+# Modo lote de la API: varios dominios por petición al endpoint de lotes
+# (ver crawler_api_php.py y servidor_api.py). Desactivado por defecto.
+API_BATCH_MODE = False
+API_BATCH_SIZE = 25
+# Salida Parquet particionada por país y sector, dentro de OUTPUT_FOLDER (requiere pyarrow)
+PARQUET_OUTPUT = True
+PARQUET_FOLDER = "parquet"
@@ -2,34 +2,88 @@
 # -*- coding: utf-8 -*-
 
 import re
-import requests
-import time
 import sys
 import json
 import select
-from urllib.parse import urljoin, urlparse
-from collections import deque
+import asyncio
+import heapq
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse, urldefrag, unquote, parse_qsl
+from http_pool import get_session, ensure_pool_capacity
+from extractor import ExtractorPagina, SOCIAL_REGEX
 
 # Configuración del crawler
 MAX_DOWNLOAD_SIZE = 2 * 1024 * 1024  # 2 MB
+DOWNLOAD_CHUNK_SIZE = 64 * 1024      # bytes leídos por iteración
+INITIAL_BUFFER_SIZE = 128 * 1024     # reserva inicial si el servidor no envía Content-Length
 MAX_PAGES = 50
 MAX_DEPTH = 2
 MAX_CHILD_LINKS = 10
 REQUEST_TIMEOUT = 15  # segundos de timeout para la petición HTTP
 
-# Expresiones regulares (SIN grupos de captura) para redes sociales
-SOCIAL_REGEX = {
-    'Instagram': r'https?:\/\/(?:www\.)?instagram\.com\/(?!about|explore|developer|legal|press|privacy|terms|accounts|directory|p\/|reel\/|stories\/)[A-Za-z0-9_.]{1,30}(?:\/)?',
-    'Facebook':  r'https?:\/\/(?:[a-z0-9-]+\.)*facebook\.com\/(?!pages|groups|events|help|policies|marketplace|watch|live|settings|messages|notifications|bookmarks|memories|fundraisers|games|jobs|privacy|terms|login|dialog|plugins|tr\/?|sharer(?:\.php)?\/?)[A-Za-z0-9.]{5,50}(?:\/)?',
-    'YouTube':   r'https?:\/\/(?:www\.)?youtube\.com\/(?:c\/|channel\/|user\/|@)[A-Za-z0-9_\-]{1,50}(?:\/)?',
-    'LinkedIn':  r'https?:\/\/(?:[a-z]{2,3}\.)?linkedin\.com\/(?:company\/|in\/)[A-Za-z0-9_\-]{1,50}(?:\/)?',
-    'Twitter':   r'https?:\/\/(?:www\.)?(?:x\.com|twitter\.com)\/(?!home|explore|notifications|messages|intent|share|search)[A-Za-z0-9_]{1,15}(?:\/)?',
-    'TikTok':    r'https?:\/\/(?:www\.)?tiktok\.com\/@(?!live|discover|tag|music|video)[A-Za-z0-9_.\-]{1,24}(?:\/)?',
-    'Pinterest': r'https?:\/\/(?:www\.)?pinterest\.com\/(?!pin|explore|topics|login|signup|categories|about)[A-Za-z0-9_.\-\/]+'
+# Prioridad de las páginas en la frontera de rastreo: se puntúa la ruta de la URL, los
+# valores de su query (no las claves: '?page_id=12', '?p=3') y el texto del enlace (ES/IT/PT/EN). Cada palabra clave encaja como inicio de palabra
+# ("contact" encaja con "contactanos"); se comparan sin tildes ni mayúsculas.
+PRIORITY_KEYWORDS = {
+    10: [  # contacto
+        'contact', 'contatt', 'contatos', 'contate', 'fale conosco', 'escribenos', 'scrivici',
+        'donde estamos', 'dove siamo', 'onde estamos', 'localizacion', 'find us', 'get in touch',
+    ],
+    8: [  # aviso legal y privacidad
+        'aviso legal', 'legal', 'note legali', 'nota legal', 'impressum', 'imprint',
+        'privacidad', 'privacy', 'privacidade', 'proteccion de datos', 'rgpd', 'gdpr', 'lopd',
+        'terminos', 'termini', 'termos', 'terms', 'condiciones', 'condizioni', 'condicoes',
+    ],
+    5: [  # quiénes somos
+        'quienes somos', 'sobre nosotros', 'nosotros', 'about', 'chi siamo', 'azienda',
+        'sobre nos', 'quem somos', 'empresa', 'equipo', 'team', 'equipa', 'staff',
+    ],
 }
-
-# Expresión regular para correos electrónicos (sin grupos de captura)
-EMAIL_REGEX = r'[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}'
+# Páginas que casi nunca tienen datos de contacto (se puntúan en negativo; solo se
+# buscan en los segmentos de la ruta)
+PRIORITY_PENALTY = 6
+PENALTY_KEYWORDS = [
+    'blog', 'noticias', 'noticia', 'news', 'notizie', 'articulo', 'articolo', 'post', 'posts',
+    'producto', 'productos', 'product', 'products', 'prodotto', 'prodotti', 'produto', 'produtos',
+    'shop', 'tienda', 'negozio', 'loja', 'cart', 'carrito', 'carrello', 'carrinho', 'checkout',
+    'tag', 'tags', 'category', 'categoria', 'page', 'feed', 'login', 'wp login', 'search',
+]
+DEPTH_PENALTY = 1  # se resta por cada nivel de profundidad
+# Extensiones que no se descargan (no son páginas HTML)
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.zip', '.rar',
+                   '.mp3', '.mp4', '.avi', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.css', '.js')
+
+# Parada anticipada del rastreo de un dominio: se para al tener STOP_MIN_EMAILS emails y
+# STOP_MIN_SOCIAL redes sociales distintas, salvo que en la frontera queden páginas con
+# prioridad STOP_MIN_PRIORITY o más sin visitar. Con 3 se visitan siempre todas las de
+# contacto, aviso legal y quiénes somos/equipo hasta MAX_DEPTH (descontado DEPTH_PENALTY
+# por nivel), que son las que aportan más emails; solo se dejan sin visitar las páginas
+# sin palabras clave, de modo que el primer email encontrado no corta el rastreo.
+STOP_WHEN_FOUND = True
+STOP_MIN_EMAILS = 1
+STOP_MIN_SOCIAL = 1
+STOP_MIN_PRIORITY = 3
+
+# Configuración del motor asíncrono
+GLOBAL_CONCURRENCY = 200  # peticiones simultáneas en total (todos los dominios)
+DOMAIN_CONCURRENCY = 5    # peticiones simultáneas contra un mismo dominio
+
+# Extractor de una sola pasada (los patrones SOCIAL_REGEX y EMAIL_REGEX están en extractor.py)
+EXTRACTOR = ExtractorPagina()
+
+# Tipos de contenido que merece la pena descargar (el resto se descarta por cabeceras)
+ALLOWED_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+# Compresión aceptada: brotli solo si urllib3 puede descomprimirlo
+try:
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        import brotlicffi  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
 
 # Palabras clave para excluir correos electrónicos
 EXCLUDE_WORDS = ['legal', 'datos', 'proteccion', 'lopd', 'rgpd', 'png']
@@ -71,42 +125,94 @@ def domain_exists(url: str) -> bool:
 
     # Aquí hacemos un pequeño truco con requests para ver si resuelve
     # (O podrías hacer socket.gethostbyname(hostname)).
+    # Con stream=True solo se leen las cabeceras, no se descarga el cuerpo.
     try:
-        _ = requests.get(url, timeout=REQUEST_TIMEOUT)
-        return True
+        with get_session().get(url, timeout=REQUEST_TIMEOUT, stream=True):
+            return True
     except:
         return False
 
 
+def is_allowed_content_type(content_type: str) -> bool:
+    """
+    Indica si la cabecera Content-Type corresponde a una página de texto/HTML.
+    Si el servidor no la envía, se da por buena.
+    """
+    if not content_type:
+        return True
+    mime = content_type.split(';', 1)[0].strip().lower()
+    return mime in ALLOWED_CONTENT_TYPES
+
+
+def read_body(r) -> bytearray:
+    """
+    Lee el cuerpo (ya descomprimido) de una respuesta en streaming sobre un bytearray
+    reservado de antemano, sin concatenar bytes (coste lineal).
+    Devuelve None si se supera MAX_DOWNLOAD_SIZE.
+    """
+    # Content-Length es el tamaño comprimido: solo sirve como estimación inicial
+    content_length = r.headers.get('Content-Length', '')
+    if content_length.isdigit():
+        capacity = min(int(content_length), MAX_DOWNLOAD_SIZE) + 1
+    else:
+        capacity = INITIAL_BUFFER_SIZE
+
+    buffer = bytearray(capacity)
+    size = 0
+    for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+        end = size + len(chunk)
+        if end > MAX_DOWNLOAD_SIZE:
+            return None
+        # Dentro de la reserva es una copia directa; si no cabe, bytearray crece de forma amortizada
+        buffer[size:end] = chunk
+        size = end
+
+    del buffer[size:]
+    return buffer
+
+
 def fetch_content(url: str) -> dict:
     """
-    Devuelve un dict con 'error'=False y 'content' si todo va bien.
+    Devuelve un dict con 'error'=False y 'content' (bytes sin decodificar) si todo va bien.
     Si no, 'error'=True y 'message'.
-    Límite de 2MB a descargar.
+    En ambos casos 'responde' indica si el servidor llegó a contestar
+    (sirve como comprobación de que el dominio existe).
+    Límite de 2MB a descargar. Las respuestas que no son HTML/texto
+    (imágenes, PDF...) se descartan por cabecera sin descargar el cuerpo.
     """
     try:
         # Stream=True nos deja controlar la descarga
-        with requests.get(url, timeout=REQUEST_TIMEOUT, stream=True) as r:
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        with get_session().get(url, timeout=REQUEST_TIMEOUT, stream=True, headers=headers) as r:
             r.raise_for_status()
 
+            content_type = r.headers.get('Content-Type', '')
+            if not is_allowed_content_type(content_type):
+                return {
+                    'error': True,
+                    'responde': True,
+                    'message': f"Tipo de contenido no soportado: {content_type}"
+                }
+
             # Limitar a MAX_DOWNLOAD_SIZE
-            content_bytes = b''
-            for chunk in r.iter_content(chunk_size=4096):
-                content_bytes += chunk
-                if len(content_bytes) > MAX_DOWNLOAD_SIZE:
-                    return {
-                        'error': True,
-                        'message': f"Se superó el límite de {MAX_DOWNLOAD_SIZE} bytes."
-                    }
-            content = content_bytes.decode('utf-8', errors='replace')
+            content = read_body(r)
+            if content is None:
+                return {
+                    'error': True,
+                    'responde': True,
+                    'message': f"Se superó el límite de {MAX_DOWNLOAD_SIZE} bytes."
+                }
 
         return {
             'error': False,
+            'responde': True,
             'content': content
         }
     except Exception as e:
         return {
             'error': True,
+            # Los errores HTTP (4xx/5xx) llevan respuesta: el dominio existe
+            'responde': getattr(e, 'response', None) is not None,
             'message': str(e)
         }
 
@@ -126,12 +232,166 @@ def convert_relative_url(link: str, base_url: str) -> str:
     return urljoin(base_url, link)
 
 
-def process_domain(domain: str) -> dict:
+def _normalizar_texto(texto: str) -> str:
+    """Minúsculas, sin tildes y con cualquier separador convertido en espacio."""
+    texto = unicodedata.normalize('NFKD', unquote(texto).lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.split(r'[^a-z0-9]+', texto)).strip()
+
+
+def _compilar_palabras(palabras, palabra_completa=False):
+    fin = r'\b' if palabra_completa else ''
+    alternativas = '|'.join(re.escape(_normalizar_texto(p)) for p in palabras)
+    return re.compile(rf'\b(?:{alternativas}){fin}')
+
+
+_PRIORIDADES = [(peso, _compilar_palabras(palabras))
+                for peso, palabras in sorted(PRIORITY_KEYWORDS.items(), reverse=True)]
+_PENALIZACION = _compilar_palabras(PENALTY_KEYWORDS, palabra_completa=True)
+
+
+def puntuar_enlace(url: str, texto: str = '') -> int:
+    """
+    Prioridad de un enlace según su ruta, los valores de su query y su texto:
+    el peso de la mejor categoría de PRIORITY_KEYWORDS que aparezca en
+    cualquiera de ellos, menos PRIORITY_PENALTY si la ruta (solo la ruta)
+    parece de blog, tienda, etiquetas...
+    """
+    parsed = urlparse(url)
+    ruta = _normalizar_texto(parsed.path)
+    valores = ' '.join(valor for _, valor in parse_qsl(parsed.query))
+    destino = _normalizar_texto(f"{parsed.path} {valores}")
+    texto = _normalizar_texto(texto) if texto else ''
+    puntuacion = 0
+    for peso, patron in _PRIORIDADES:
+        if patron.search(destino) or (texto and patron.search(texto)):
+            puntuacion = peso
+            break
+    if _PENALIZACION.search(ruta):
+        puntuacion -= PRIORITY_PENALTY
+    return puntuacion
+
+
+class FronteraRastreo:
+    """
+    Frontera de rastreo ordenada por prioridad (heapq): siguiente() devuelve la
+    URL pendiente con mayor puntuación (puntuar_enlace menos DEPTH_PENALTY por
+    nivel); a igual puntuación, la que se añadió antes.
+    Cada URL entra una sola vez.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._orden = 0
+        self._vistas = set()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, url):
+        return url in self._vistas
+
+    def agregar(self, url: str, depth: int, puntuacion: int = 0):
+        if url in self._vistas:
+            return
+        self._vistas.add(url)
+        prioridad = puntuacion - depth * DEPTH_PENALTY
+        heapq.heappush(self._heap, (-prioridad, self._orden, url, depth))
+        self._orden += 1
+
+    def siguiente(self):
+        """(url, depth) de mayor prioridad."""
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+    def mejor_prioridad(self):
+        """Prioridad de la siguiente URL, o None si la frontera está vacía."""
+        return -self._heap[0][0] if self._heap else None
+
+
+def rastreo_suficiente(emails: set, social_links: dict, frontera: FronteraRastreo,
+                       stop_when_found: bool = STOP_WHEN_FOUND) -> bool:
+    """
+    True si ya se puede parar el rastreo del dominio: hay STOP_MIN_EMAILS emails y
+    STOP_MIN_SOCIAL redes, y no quedan páginas de contacto, aviso legal o quiénes
+    somos por visitar (ver STOP_MIN_PRIORITY).
+    """
+    if not stop_when_found:
+        return False
+    if len(emails) < STOP_MIN_EMAILS:
+        return False
+    if sum(1 for enlaces in social_links.values() if enlaces) < STOP_MIN_SOCIAL:
+        return False
+    mejor = frontera.mejor_prioridad()
+    return mejor is None or mejor < STOP_MIN_PRIORITY
+
+
+
+def extraer_datos_pagina(content: bytes, emails: set, social_links: dict, con_enlaces: bool = True) -> list:
+    """
+    Recorre una sola vez el contenido (bytes) de una página, añade los correos y
+    enlaces de redes sociales a los conjuntos 'emails' y 'social_links' recibidos
+    y devuelve los enlaces encontrados como (href, texto del enlace)
+    (lista vacía si con_enlaces=False).
+    """
+    resultado = EXTRACTOR.extraer(content, con_enlaces)
+
+    # Correos
+    for em in resultado.emails:
+        em_lower = em.lower()
+        # Verificar si contiene alguna palabra que lo excluye
+        if any(word in em_lower for word in EXCLUDE_WORDS):
+            continue
+        emails.add(em_lower)
+
+    # Enlaces de redes sociales
+    for platform, match_list in resultado.social_links.items():
+        for match in match_list:
+            # Limpiar de posibles caracteres raros al final:
+            social_links[platform].add(match.rstrip('ª]'))
+
+    return list(zip(resultado.enlaces, resultado.textos))
+
+
+def extraer_enlaces_hijos(links: list, current_url: str, netloc_inicial: str, visited) -> list:
+    """
+    Devuelve, como (url absoluta, puntuación), los MAX_CHILD_LINKS enlaces del mismo
+    dominio y todavía no vistos con mejor puntuación (ver puntuar_enlace).
+    'links' son pares (href, texto del enlace); se ignoran los anclajes (#...) y
+    los archivos que no son páginas (SKIP_EXTENSIONS).
+    """
+    candidatos = {}
+
+    for link, texto in links:
+        absolute_link = convert_relative_url(link, current_url)
+        if not absolute_link:
+            continue
+        absolute_link = urldefrag(absolute_link)[0]
+
+        parsed_link = urlparse(absolute_link)
+        # Agregamos solo si coincide el mismo dominio
+        if parsed_link.netloc != netloc_inicial or absolute_link in visited:
+            continue
+        if parsed_link.path.lower().endswith(SKIP_EXTENSIONS):
+            continue
+        # Si la misma URL aparece varias veces, cuenta su mejor enlace
+        puntuacion = puntuar_enlace(absolute_link, texto)
+        if puntuacion > candidatos.get(absolute_link, float('-inf')):
+            candidatos[absolute_link] = puntuacion
+
+    # sorted es estable: a igual puntuación se mantiene el orden de la página
+    mejores = sorted(candidatos.items(), key=lambda item: -item[1])
+    return mejores[:MAX_CHILD_LINKS]
+
+
+def process_domain(domain: str, max_pages: int = MAX_PAGES, stop_when_found: bool = STOP_WHEN_FOUND) -> dict:
     """
     Función principal que:
     1. Limpia y valida la URL de entrada,
-    2. Comprueba si el dominio existe,
-    3. Hace crawling hasta MAX_PAGES y MAX_DEPTH,
+    2. Comprueba si el dominio existe descargando la portada (que se reutiliza como primera página),
+    3. Hace crawling hasta 'max_pages' y MAX_DEPTH, visitando primero las páginas con más
+       probabilidad de tener datos de contacto (ver FronteraRastreo); con 'stop_when_found'
+       para antes si ya tiene emails y redes (ver rastreo_suficiente),
     4. Extrae emails y links de redes sociales,
     5. Devuelve un diccionario con los resultados.
     """
@@ -142,27 +402,29 @@ def process_domain(domain: str) -> dict:
             'message': 'URL inválida.'
         }
 
-    if not domain_exists(url_inicial):
+    # La comprobación de que el dominio responde descarga la portada,
+    # que se reutiliza como primera página del crawling (sin segunda petición)
+    prefetched = {url_inicial: fetch_content(url_inicial)}
+    if not prefetched[url_inicial]['responde']:
         return {
             'error': True,
             'message': 'El dominio no existe o no responde.'
         }
 
-    visited = set()
-    queue = deque()
-    queue.append((url_inicial, 0))  # (URL, profundidad)
+    frontera = FronteraRastreo()
+    frontera.agregar(url_inicial, 0)  # (URL, profundidad)
     emails = set()
     social_links = {key: set() for key in SOCIAL_REGEX.keys()}
+    netloc_inicial = urlparse(url_inicial).netloc
 
     pages_crawled = 0
 
-    while queue and pages_crawled < MAX_PAGES:
-        current_url, depth = queue.popleft()
-        if current_url in visited:
-            continue
-        visited.add(current_url)
+    while frontera and pages_crawled < max_pages:
+        if rastreo_suficiente(emails, social_links, frontera, stop_when_found):
+            break
+        current_url, depth = frontera.siguiente()
 
-        fetch_result = fetch_content(current_url)
+        fetch_result = prefetched.pop(current_url, None) or fetch_content(current_url)
         if fetch_result['error']:
             # Loguea el error y sigue con la siguiente URL
             # print(f"Error en {current_url}: {fetch_result['message']}")
@@ -172,44 +434,12 @@ def process_domain(domain: str) -> dict:
         if not content:
             continue
 
-        # Buscar correos
-        email_matches = re.findall(EMAIL_REGEX, content, flags=re.IGNORECASE)
-        for em in email_matches:
-            em_lower = em.lower()
-            # Verificar si contiene alguna palabra que lo excluye
-            if any(word in em_lower for word in EXCLUDE_WORDS):
-                continue
-            emails.add(em_lower)
-
-        # Buscar enlaces de redes sociales
-        for platform, regex_pattern in SOCIAL_REGEX.items():
-            match_list = re.findall(regex_pattern, content, flags=re.IGNORECASE)
-            for match in match_list:
-                # Asegurarnos de que sea un string (re.findall sin grupos de captura devuelve strings)
-                if isinstance(match, str):
-                    # Limpiar de posibles caracteres raros al final:
-                    match_cleaned = match.rstrip('ª]')
-                    social_links[platform].add(match_cleaned)
+        links = extraer_datos_pagina(content, emails, social_links, con_enlaces=depth < MAX_DEPTH)
 
         # Extraer enlaces internos para continuar crawleando
         if depth < MAX_DEPTH:
-            link_matches = re.findall(r'<a\s+[^>]*href=["\']([^"\']+)["\']', content, flags=re.IGNORECASE)
-            child_links_added = 0
-            parsed_inicial = urlparse(url_inicial)
-
-            for link in link_matches:
-                absolute_link = convert_relative_url(link, current_url)
-                if not absolute_link:
-                    continue
-
-                parsed_link = urlparse(absolute_link)
-                # Agregamos solo si coincide el mismo dominio
-                if parsed_link.netloc == parsed_inicial.netloc:
-                    if absolute_link not in visited:
-                        queue.append((absolute_link, depth + 1))
-                        child_links_added += 1
-                        if child_links_added >= MAX_CHILD_LINKS:
-                            break
+            for absolute_link, puntuacion in extraer_enlaces_hijos(links, current_url, netloc_inicial, frontera):
+                frontera.agregar(absolute_link, depth + 1, puntuacion)
 
         pages_crawled += 1
 
@@ -218,10 +448,150 @@ def process_domain(domain: str) -> dict:
         'error': False,
         'message': 'Crawling finalizado',
         'emails': sorted(list(emails)),
-        'social_links': {k: sorted(list(v)) for k, v in social_links.items()}
+        'social_links': {k: sorted(list(v)) for k, v in social_links.items()},
+        'pages_crawled': pages_crawled
     }
 
 
+async def process_domain_async(domain: str, global_semaphore: asyncio.Semaphore = None,
+                               executor: ThreadPoolExecutor = None,
+                               domain_concurrency: int = DOMAIN_CONCURRENCY,
+                               max_pages: int = MAX_PAGES, stop_when_found: bool = STOP_WHEN_FOUND) -> dict:
+    """
+    Versión asíncrona de process_domain.
+    'domain_concurrency' trabajadores van sacando de la frontera compartida la
+    página pendiente con más prioridad (ver FronteraRastreo) y la descargan, respetando:
+      - 'global_semaphore': límite de peticiones simultáneas compartido entre dominios,
+      - 'domain_concurrency': límite de peticiones simultáneas contra este dominio.
+    Las descargas se ejecutan en 'executor' (hilos) reutilizando fetch_content.
+    Se para con los mismos criterios que process_domain ('max_pages', 'stop_when_found').
+    Devuelve el mismo diccionario que process_domain.
+    """
+    url_inicial = clean_url(domain)
+    if not url_inicial:
+        return {
+            'error': True,
+            'message': 'URL inválida.'
+        }
+
+    loop = asyncio.get_running_loop()
+    if global_semaphore is None:
+        global_semaphore = asyncio.Semaphore(GLOBAL_CONCURRENCY)
+    domain_semaphore = asyncio.Semaphore(domain_concurrency)
+
+    async def _ejecutar(func, url):
+        # Primero el límite del dominio, así un dominio lento no acapara huecos globales
+        async with domain_semaphore:
+            async with global_semaphore:
+                return await loop.run_in_executor(executor, func, url)
+
+    async def _obtener(url):
+        if url in prefetched:
+            return prefetched.pop(url)
+        return await _ejecutar(fetch_content, url)
+
+    # La portada sirve a la vez de comprobación de existencia y de primera página
+    prefetched = {url_inicial: await _ejecutar(fetch_content, url_inicial)}
+    if not prefetched[url_inicial]['responde']:
+        return {
+            'error': True,
+            'message': 'El dominio no existe o no responde.'
+        }
+
+    frontera = FronteraRastreo()
+    frontera.agregar(url_inicial, 0)
+    emails = set()
+    social_links = {key: set() for key in SOCIAL_REGEX.keys()}
+    netloc_inicial = urlparse(url_inicial).netloc
+
+    pages_crawled = 0
+    en_curso = 0
+    cambio = asyncio.Condition()
+
+    def terminado():
+        return pages_crawled >= max_pages or rastreo_suficiente(emails, social_links, frontera, stop_when_found)
+
+    async def trabajador():
+        nonlocal pages_crawled, en_curso
+        while True:
+            async with cambio:
+                # Esperar a que haya una página que descargar sin pasarse del máximo,
+                # o a que terminen las descargas en curso (pueden añadir enlaces)
+                while True:
+                    if terminado():
+                        return
+                    if frontera and pages_crawled + en_curso < max_pages:
+                        break
+                    if not en_curso:
+                        return
+                    await cambio.wait()
+                current_url, depth = frontera.siguiente()
+                en_curso += 1
+
+            links = []
+            correcta = False
+            try:
+                fetch_result = await _obtener(current_url)
+                if not fetch_result['error'] and fetch_result['content']:
+                    links = extraer_datos_pagina(fetch_result['content'], emails, social_links,
+                                                 con_enlaces=depth < MAX_DEPTH)
+                    correcta = True
+            finally:
+                async with cambio:
+                    en_curso -= 1
+                    if correcta:
+                        pages_crawled += 1
+                        if depth < MAX_DEPTH:
+                            for absolute_link, puntuacion in extraer_enlaces_hijos(
+                                    links, current_url, netloc_inicial, frontera):
+                                frontera.agregar(absolute_link, depth + 1, puntuacion)
+                    cambio.notify_all()
+
+    await asyncio.gather(*(trabajador() for _ in range(max(1, domain_concurrency))))
+
+    return {
+        'error': False,
+        'message': 'Crawling finalizado',
+        'emails': sorted(list(emails)),
+        'social_links': {k: sorted(list(v)) for k, v in social_links.items()},
+        'pages_crawled': pages_crawled
+    }
+
+
+async def process_domains_async(domains: list, global_concurrency: int = GLOBAL_CONCURRENCY,
+                                domain_concurrency: int = DOMAIN_CONCURRENCY) -> dict:
+    """
+    Procesa muchos dominios a la vez con process_domain_async.
+    Todas las descargas comparten un único límite global ('global_concurrency')
+    y cada dominio tiene su propio límite ('domain_concurrency').
+    Devuelve un dict {dominio: resultado} con el mismo formato que process_domain.
+    """
+    global_semaphore = asyncio.Semaphore(global_concurrency)
+    ensure_pool_capacity(domain_concurrency)
+    unique_domains = list(dict.fromkeys(domains))
+
+    with ThreadPoolExecutor(max_workers=global_concurrency) as executor:
+        results = await asyncio.gather(*(
+            process_domain_async(domain, global_semaphore, executor, domain_concurrency)
+            for domain in unique_domains
+        ), return_exceptions=True)
+
+    output = {}
+    for domain, result in zip(unique_domains, results):
+        if isinstance(result, Exception):
+            result = {'error': True, 'message': str(result)}
+        output[domain] = result
+    return output
+
+
+def process_domains(domains: list, global_concurrency: int = GLOBAL_CONCURRENCY,
+                    domain_concurrency: int = DOMAIN_CONCURRENCY) -> dict:
+    """
+    Envoltorio síncrono de process_domains_async para usarlo desde código no asíncrono.
+    """
+    return asyncio.run(process_domains_async(domains, global_concurrency, domain_concurrency))
+
+
 def main():
     """
     Si se llama directamente desde la terminal:
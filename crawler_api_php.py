@@ -1,23 +1,457 @@
 #!/usr/bin/env python3
+import concurrent.futures
+import random
+import threading
+import time
+from collections import Counter, deque
+from urllib.parse import urlparse
 import requests
 from colorama import Fore
+from http_pool import get_session, ensure_pool_capacity
+from configuracion import API_MAX_WORKERS
 
 PHP_API_URL = "https://centralapi.site/apiemailsocial.php"
+PHP_API_BATCH_URL = "https://centralapi.site/apiemailsocial_batch.php"
+PHP_API_HOST = urlparse(PHP_API_URL).hostname
+PHP_API_TIMEOUT = 15                # segundos por petición
+PHP_API_BATCH_TIMEOUT = 180         # segundos por petición de lote (el servidor rastrea todas las webs)
 
-def call_api_php(domain):
+# Reintentos con espera exponencial y jitter ("full jitter")
+API_MAX_RETRIES = 2                 # reintentos tras el primer intento
+API_BACKOFF_BASE = 0.5              # segundos
+API_BACKOFF_MAX = 8.0               # segundos
+
+# Peticiones duplicadas ("hedging"): si una llamada supera el percentil indicado
+# de las latencias recientes, se lanza una segunda y se usa la primera que responda
+API_HEDGE_PERCENTILE = 0.95
+API_HEDGE_MIN_SAMPLES = 20          # latencias necesarias antes de empezar a duplicar
+API_HEDGE_MAX_RATIO = 0.10          # como mucho un 10 % de peticiones duplicadas
+API_LATENCY_SAMPLES = 500           # latencias recientes que se conservan
+
+# Circuit breaker: tras API_BREAKER_FAILURES fallos seguidos se pausa el envío
+# API_BREAKER_COOLDOWN segundos y luego se prueba con una sola petición
+API_BREAKER_FAILURES = 5
+API_BREAKER_COOLDOWN = 30.0
+
+# Códigos HTTP que merece la pena reintentar
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def _restante(limite):
+    """Segundos que faltan hasta 'limite' (instante de time.monotonic()); nunca negativo."""
+    return max(limite - time.monotonic(), 0.0)
+
+
+class ErrorAPI(Exception):
+    """Fallo de una petición a la API; 'resultado' es la clave del contador y 'reintentable' si procede repetir."""
+
+    def __init__(self, mensaje, resultado, reintentable):
+        super().__init__(mensaje)
+        self.resultado = resultado
+        self.reintentable = reintentable
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de tres estados:
+      - cerrado: las peticiones pasan; se cuentan los fallos seguidos.
+      - abierto: tras 'fallos' fallos seguidos, nadie envía durante 'enfriamiento' segundos.
+      - semiabierto: pasado el enfriamiento sale una sola petición de prueba;
+        si va bien se cierra, si falla se vuelve a abrir.
+    Mientras está abierto, esperar_turno() bloquea en lugar de enviar.
+    """
+
+    def __init__(self, fallos=API_BREAKER_FAILURES, enfriamiento=API_BREAKER_COOLDOWN):
+        self.fallos = fallos
+        self.enfriamiento = enfriamiento
+        self._condicion = threading.Condition()
+        self._estado = "cerrado"
+        self._fallos_seguidos = 0
+        self._reabrir_en = 0.0
+        self._prueba_en_curso = False
+        self.aperturas = 0
+
+    @property
+    def estado(self):
+        with self._condicion:
+            return self._estado
+
+    def esperar_turno(self, timeout=None):
+        """Espera a que el circuito deje pasar una petición. Devuelve False si vence 'timeout'."""
+        limite = time.monotonic() + timeout if timeout is not None else None
+        with self._condicion:
+            while True:
+                ahora = time.monotonic()
+                if self._estado == "cerrado":
+                    return True
+                if self._estado == "abierto" and ahora >= self._reabrir_en:
+                    self._estado = "semiabierto"
+                if self._estado == "semiabierto" and not self._prueba_en_curso:
+                    self._prueba_en_curso = True
+                    return True
+                espera = self._reabrir_en - ahora if self._estado == "abierto" else 1.0
+                if limite is not None:
+                    if ahora >= limite:
+                        return False
+                    espera = min(espera, limite - ahora)
+                self._condicion.wait(max(espera, 0.01))
+
+    def registrar(self, exito):
+        with self._condicion:
+            prueba = self._estado == "semiabierto" and self._prueba_en_curso
+            self._prueba_en_curso = False
+            if exito:
+                self._fallos_seguidos = 0
+                if self._estado != "cerrado":
+                    print(Fore.GREEN + "🔌 API recuperada: se reanudan las llamadas.")
+                self._estado = "cerrado"
+            else:
+                self._fallos_seguidos += 1
+                if prueba or (self._estado == "cerrado" and self._fallos_seguidos >= self.fallos):
+                    self._estado = "abierto"
+                    self._reabrir_en = time.monotonic() + self.enfriamiento
+                    self.aperturas += 1
+                    print(Fore.RED + f"🔌 API fallando ({self._fallos_seguidos} fallos seguidos): "
+                                     f"pausa de {self.enfriamiento:.0f}s.")
+            self._condicion.notify_all()
+
+    def liberar(self):
+        """
+        Devuelve el turno de una petición que terminó sin veredicto sobre la API
+        (p. ej. una excepción local): si era la de prueba, otra puede ocupar su lugar.
+        """
+        with self._condicion:
+            self._prueba_en_curso = False
+            self._condicion.notify_all()
+
+
+class ClienteAPI:
+    """
+    Cliente de la API PHP con reintentos, peticiones duplicadas y circuit breaker.
+
+      - Reintenta timeouts, errores de conexión, 429 y 5xx con espera exponencial con jitter.
+      - Si una petición tarda más que el percentil API_HEDGE_PERCENTILE de las latencias
+        recientes, lanza una copia y se queda con la primera respuesta correcta.
+      - Pausa el envío mientras el circuit breaker está abierto.
+      - Cuenta cada resultado (ok, timeout, http_5xx, hedge_ganador...) en 'contadores'.
+
+    También consulta varios dominios por petición contra el endpoint de lotes
+    (consultar_lote), con los mismos reintentos y circuit breaker.
+    Las URL son configurables para poder probarlo contra un servidor local
+    (ver servidor_api.py).
+    """
+
+    def __init__(self, url=PHP_API_URL, timeout=PHP_API_TIMEOUT, batch_url=None, batch_timeout=PHP_API_BATCH_TIMEOUT,
+                 max_reintentos=API_MAX_RETRIES,
+                 backoff_base=API_BACKOFF_BASE, backoff_max=API_BACKOFF_MAX,
+                 hedge_percentil=API_HEDGE_PERCENTILE, hedge_min_muestras=API_HEDGE_MIN_SAMPLES,
+                 hedge_max_ratio=API_HEDGE_MAX_RATIO, breaker=None, max_hilos=2 * API_MAX_WORKERS):
+        self.url = url
+        self.host = urlparse(url).hostname
+        self.timeout = timeout
+        # Por defecto, el endpoint de lotes vive junto al individual
+        if batch_url is None:
+            batch_url = PHP_API_BATCH_URL if url == PHP_API_URL else url.replace(".php", "_batch.php")
+        self.batch_url = batch_url
+        self.batch_timeout = batch_timeout
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentil = hedge_percentil
+        self.hedge_min_muestras = hedge_min_muestras
+        self.hedge_max_ratio = hedge_max_ratio
+        self.breaker = breaker or CircuitBreaker()
+        self.max_hilos = max_hilos
+        self._lock = threading.Lock()
+        self._latencias = deque(maxlen=API_LATENCY_SAMPLES)
+        self._peticiones = 0
+        self._peticiones_lote = 0
+        self._duplicadas = 0
+        self.contadores = Counter()
+        # Hilos donde corren las peticiones (la original y, si hace falta, su copia)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="api-http")
+
+    # ---------------------------------------------------------
+    # Petición HTTP
+    # ---------------------------------------------------------
+    def _enviar(self, metodo, url, timeout, **kwargs):
+        """Envía una petición y devuelve el JSON de la respuesta; lanza ErrorAPI si falla."""
+        try:
+            response = get_session().request(metodo, url, timeout=timeout, **kwargs)
+        except requests.exceptions.Timeout as e:
+            raise ErrorAPI(str(e), "timeout", True)
+        except requests.exceptions.ConnectionError as e:
+            raise ErrorAPI(str(e), "error_conexion", True)
+        except requests.exceptions.RequestException as e:
+            raise ErrorAPI(str(e), "error_peticion", False)
+
+        if response.status_code >= 400:
+            if response.status_code >= 500:
+                tipo = "http_5xx"
+            elif response.status_code == 429:
+                tipo = "http_429"
+            else:
+                tipo = "http_4xx"
+            raise ErrorAPI(f"HTTP {response.status_code} para {url}", tipo,
+                           response.status_code in RETRYABLE_STATUS)
+        try:
+            return response.json()
+        except ValueError:
+            raise ErrorAPI("Invalid JSON response", "json_invalido", False)
+
+    def _peticion(self, domain):
+        inicio = time.monotonic()
+        data = self._enviar("GET", self.url, self.timeout, params={"domain": domain})
+        with self._lock:
+            self._latencias.append(time.monotonic() - inicio)
+        return data
+
+    def _peticion_lote(self, domains, limite=None):
+        with self._lock:
+            self._peticiones_lote += 1
+        timeout = self.batch_timeout
+        if limite is not None:
+            timeout = min(timeout, _restante(limite))
+            if timeout <= 0:
+                raise ErrorAPI("Plazo agotado antes de enviar el lote", "plazo_agotado", False)
+        data = self._enviar("POST", self.batch_url, timeout, json={"domains": list(domains)})
+        if not isinstance(data, dict) or not isinstance(data.get("results"), dict):
+            raise ErrorAPI("Respuesta de lote sin 'results'", "json_invalido", False)
+        return data["results"]
+
+    def _umbral_hedge(self):
+        """Latencia a partir de la cual se duplica la petición, o None si no procede."""
+        with self._lock:
+            if len(self._latencias) < self.hedge_min_muestras:
+                return None
+            if self._duplicadas >= self.hedge_max_ratio * self._peticiones:
+                return None
+            ordenadas = sorted(self._latencias)
+            return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * self.hedge_percentil))]
+
+    def _intento(self, domain, limite=None):
+        """
+        Un intento, con copia de la petición si la original se retrasa.
+        Con 'limite' (instante de time.monotonic()) deja de esperar al llegar a él
+        y lanza ErrorAPI "plazo_agotado"; la petición termina sola en segundo plano.
+        """
+        with self._lock:
+            self._peticiones += 1
+        futuros = [self._executor.submit(self._peticion, domain)]
+        umbral = self._umbral_hedge()
+        if umbral is not None and limite is not None:
+            umbral = min(umbral, _restante(limite))
+        if umbral is not None:
+            hechos, _ = concurrent.futures.wait(futuros, timeout=umbral)
+            if not hechos:
+                with self._lock:
+                    self._duplicadas += 1
+                    self.contadores["hedge_lanzado"] += 1
+                futuros.append(self._executor.submit(self._peticion, domain))
+
+        error = None
+        pendientes = set(futuros)
+        while pendientes:
+            restante = None if limite is None else _restante(limite)
+            hechos, pendientes = concurrent.futures.wait(pendientes, timeout=restante,
+                                                         return_when=concurrent.futures.FIRST_COMPLETED)
+            if not hechos:
+                raise ErrorAPI(f"Plazo agotado esperando la respuesta para {domain}", "plazo_agotado", False)
+            for futuro in hechos:
+                try:
+                    data = futuro.result()
+                except ErrorAPI as e:
+                    error = error or e
+                    continue
+                if len(futuros) > 1 and futuro is futuros[1]:
+                    with self._lock:
+                        self.contadores["hedge_ganador"] += 1
+                return data
+        raise error
+
+    # ---------------------------------------------------------
+    # Llamada con reintentos
+    # ---------------------------------------------------------
+    def _con_reintentos(self, funcion, *args, limite=None):
+        """
+        Ejecuta 'funcion' con reintentos (espera exponencial con jitter) respetando
+        el circuit breaker. Lanza ErrorAPI si fallan todos los intentos o el error
+        no es reintentable.
+        Con 'limite' (instante de time.monotonic()) la espera al circuito y los
+        reintentos no pasan de ese instante: se lanza el último error, o
+        ErrorAPI "circuito_abierto" si no se llegó a enviar.
+        """
+        ultimo_error = None
+        for intento in range(self.max_reintentos + 1):
+            if intento:
+                # Espera exponencial con jitter completo: uniforme entre 0 y base * 2^intento
+                espera = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+                if limite is not None and espera >= _restante(limite):
+                    break  # el reintento ya no cabe en el plazo
+                with self._lock:
+                    self.contadores["reintentos"] += 1
+                time.sleep(espera)
+
+            espera_turno = self.breaker.enfriamiento * 2
+            if limite is not None:
+                espera_turno = min(espera_turno, _restante(limite))
+            if espera_turno <= 0 or not self.breaker.esperar_turno(timeout=espera_turno):
+                with self._lock:
+                    self.contadores["circuito_abierto"] += 1
+                raise ErrorAPI("Circuito abierto: la API no responde", "circuito_abierto", False)
+
+            try:
+                data = funcion(*args)
+            except ErrorAPI as e:
+                if e.resultado == "plazo_agotado":
+                    # Sin veredicto sobre la API: se suelta el turno sin contar fallo
+                    self.breaker.liberar()
+                    with self._lock:
+                        self.contadores[e.resultado] += 1
+                    ultimo_error = e
+                    break
+                self.breaker.registrar(exito=not e.reintentable)
+                with self._lock:
+                    self.contadores[e.resultado] += 1
+                ultimo_error = e
+                if not e.reintentable:
+                    break
+                continue
+            except BaseException:
+                # Error ajeno a la API (executor cerrado, sesión...): no cuenta como
+                # fallo, pero hay que soltar el turno para no dejar la prueba bloqueada
+                self.breaker.liberar()
+                raise
+
+            self.breaker.registrar(exito=True)
+            with self._lock:
+                self.contadores["ok" if not intento else "ok_tras_reintento"] += 1
+            return data
+
+        with self._lock:
+            self.contadores["fallida"] += 1
+        raise ultimo_error
+
+    def consultar(self, domain, limite=None):
+        """
+        Devuelve el JSON de la API para 'domain'. Lanza ErrorAPI si no se consigue
+        (o no se consigue antes de 'limite', instante de time.monotonic()).
+        """
+        return self._con_reintentos(self._intento, domain, limite, limite=limite)
+
+    def consultar_lote(self, domains, limite=None):
+        """
+        Consulta varios dominios en una sola petición al endpoint de lotes
+        ('limite' como en consultar).
+        Devuelve {dominio: respuesta} con una entrada por cada dominio pedido:
+          - la respuesta del servidor para ese dominio (que puede ser su propio error),
+          - {"error": True, "lote_fallido": True, ...} si falta en la respuesta o si la
+            petición entera falló tras los reintentos (el llamador puede repetirlo por separado);
+            en este último caso lleva además "fallo_cliente" como call_api_php.
+        """
+        domains = list(dict.fromkeys(domains))
+        try:
+            resultados = self._con_reintentos(self._peticion_lote, domains, limite, limite=limite)
+        except ErrorAPI as e:
+            return {domain: {"error": True, "lote_fallido": True, "fallo_cliente": e.resultado, "message": str(e)}
+                    for domain in domains}
+
+        salida = {}
+        for domain in domains:
+            respuesta = resultados.get(domain)
+            if not isinstance(respuesta, dict):
+                with self._lock:
+                    self.contadores["lote_sin_dominio"] += 1
+                respuesta = {"error": True, "lote_fallido": True, "message": "Dominio ausente en la respuesta del lote"}
+            salida[domain] = respuesta
+        return salida
+
+    def estadisticas(self):
+        """Contadores por resultado, estado del circuito y latencias recientes."""
+        with self._lock:
+            ordenadas = sorted(self._latencias)
+            stats = dict(self.contadores)
+            stats.update({
+                "requests": self._peticiones,
+                "batch_requests": self._peticiones_lote,
+                "hedged": self._duplicadas,
+                "latency_p50": ordenadas[len(ordenadas) // 2] if ordenadas else None,
+                "latency_p95": ordenadas[int(len(ordenadas) * 0.95)] if ordenadas else None,
+            })
+        stats["breaker"] = self.breaker.estado
+        stats["breaker_openings"] = self.breaker.aperturas
+        return stats
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_CLIENTE = None
+_CLIENTE_LOCK = threading.Lock()
+
+
+def obtener_cliente_api():
+    """Cliente de la API compartido por el proceso (se crea en el primer uso)."""
+    global _CLIENTE
+    if _CLIENTE is None:
+        with _CLIENTE_LOCK:
+            if _CLIENTE is None:
+                _CLIENTE = ClienteAPI()
+                ensure_pool_capacity(_CLIENTE.max_hilos, host=_CLIENTE.host)
+    return _CLIENTE
+
+
+def configurar_cliente_api(url=PHP_API_URL, **opciones):
+    """
+    Sustituye el cliente compartido, p. ej. para apuntar a un servidor local de pruebas:
+        configurar_cliente_api("http://127.0.0.1:8000/apiemailsocial.php", max_reintentos=1)
+    """
+    global _CLIENTE
+    with _CLIENTE_LOCK:
+        anterior, _CLIENTE = _CLIENTE, ClienteAPI(url=url, **opciones)
+    if anterior is not None:
+        anterior.cerrar()
+    ensure_pool_capacity(_CLIENTE.max_hilos, host=_CLIENTE.host)
+    return _CLIENTE
+
+
+def call_api_php(domain, limite=None):
     """
     Llama a la API PHP para el dominio dado y devuelve los resultados JSON.
+    Usa el cliente compartido (reintentos, peticiones duplicadas y circuit breaker).
+    Con 'limite' (instante de time.monotonic()) no espera más allá de ese instante.
+
+    Si la API no llega a responder (timeout, HTTP 5xx, circuito abierto...) devuelve
+    {"error": True, "fallo_cliente": <ErrorAPI.resultado>, "message": ...}. Sin
+    'fallo_cliente', un "error" es la respuesta normal de la API para ese dominio
+    (p. ej. "El dominio no existe o no responde.").
     """
     try:
         print(Fore.YELLOW + f"🌐 Llamando a la API para {domain} ...")
-        response = requests.get(PHP_API_URL, params={"domain": domain}, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        data = obtener_cliente_api().consultar(domain, limite)
         print(Fore.GREEN + "✅ Respuesta recibida de la API.")
         return data
-    except requests.exceptions.RequestException as e:
-        print(Fore.RED + f"❌ Error al llamar a la API: {e}")
-        return {"error": True, "message": str(e)}
-    except ValueError:
-        print(Fore.RED + "❌ Error interpretando la respuesta de la API como JSON.")
-        return {"error": True, "message": "Invalid JSON response"}
+    except ErrorAPI as e:
+        if e.resultado == "json_invalido":
+            print(Fore.RED + "❌ Error interpretando la respuesta de la API como JSON.")
+        else:
+            print(Fore.RED + f"❌ Error al llamar a la API: {e}")
+        return {"error": True, "fallo_cliente": e.resultado, "message": str(e)}
+
+
+def call_api_php_batch(domains, limite=None):
+    """
+    Llama al endpoint de lotes de la API con varios dominios en una sola petición.
+    Devuelve {dominio: respuesta}: cada dominio tiene su propia respuesta o error,
+    de modo que un fallo parcial no afecta al resto del lote.
+    'limite' como en call_api_php.
+    """
+    domains = list(domains)
+    print(Fore.YELLOW + f"🌐 Llamando a la API por lotes para {len(domains)} dominios ...")
+    resultados = obtener_cliente_api().consultar_lote(domains, limite)
+    fallidos = sum(1 for respuesta in resultados.values() if respuesta.get("error"))
+    if fallidos:
+        print(Fore.RED + f"❌ Lote con {fallidos} de {len(domains)} dominios sin respuesta válida.")
+    else:
+        print(Fore.GREEN + f"✅ Respuesta de lote recibida ({len(domains)} dominios).")
+    return resultados
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+dns_cache.py
+
+Caché de resolución DNS (MX/A) por dominio para la validación de emails.
+
+Miles de emails comparten dominio (gmail.com, hotmail.es, telefonica.net...),
+así que la resolución se hace una vez por dominio y se reutiliza:
+  - respuestas positivas: se guardan durante el TTL del registro DNS (acotado),
+  - respuestas negativas (NXDOMAIN / sin registros): se guardan NEGATIVE_TTL segundos,
+  - errores transitorios (timeouts, servidores caídos): no se guardan.
+Opcionalmente se persiste en SQLite para reutilizarla entre ejecuciones.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import dns.resolver
+from configuracion import DNS_CACHE_FILE
+
+# Límites del TTL de las respuestas positivas (segundos)
+MIN_POSITIVE_TTL = 3600          # 1 hora
+MAX_POSITIVE_TTL = 7 * 24 * 3600 # 1 semana
+# TTL de las respuestas negativas (segundos)
+NEGATIVE_TTL = 6 * 3600          # 6 horas
+# Escrituras pendientes antes de hacer commit en SQLite
+SQLITE_COMMIT_EVERY = 100
+# Tiempo máximo por consulta DNS (segundos)
+DNS_LIFETIME = 5.0
+
+
+def crear_resolver(nameservers=None, puerto=53, timeout=DNS_LIFETIME):
+    """
+    Crea un resolver de dnspython.
+    Con 'nameservers' (p. ej. ["127.0.0.1"]) y 'puerto' se puede apuntar a un
+    servidor DNS local de pruebas en lugar de los del sistema.
+    """
+    if nameservers:
+        resolver = dns.resolver.Resolver(configure=False)
+        resolver.nameservers = list(nameservers)
+        resolver.port = puerto
+    else:
+        resolver = dns.resolver.Resolver()
+    resolver.lifetime = timeout
+    return resolver
+
+
+class CacheDNS:
+    """
+    Resuelve dominios (MX y, si no hay, A) con caché en memoria y, opcionalmente, en SQLite.
+    Es segura para usarse desde varios hilos.
+    """
+
+    def __init__(self, ruta=DNS_CACHE_FILE, resolver=None, negative_ttl=NEGATIVE_TTL,
+                 min_ttl=MIN_POSITIVE_TTL, max_ttl=MAX_POSITIVE_TTL):
+        self.ruta = ruta
+        self.negative_ttl = negative_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.resolver = resolver if resolver is not None else crear_resolver()
+
+        self._lock = threading.Lock()
+        self._entradas = {}  # dominio -> (valido, mensaje, expira)
+        self._pendientes = 0
+        self._conexion = None
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.errores_transitorios = 0
+
+        if ruta:
+            self._abrir_sqlite()
+
+    # ---------------------------------------------------------
+    # Persistencia
+    # ---------------------------------------------------------
+    def _abrir_sqlite(self):
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS dns_cache ("
+            " dominio TEXT PRIMARY KEY, valido INTEGER, mensaje TEXT, expira REAL)"
+        )
+        ahora = time.time()
+        self._conexion.execute("DELETE FROM dns_cache WHERE expira <= ?", (ahora,))
+        self._conexion.commit()
+        for dominio, valido, mensaje, expira in self._conexion.execute(
+                "SELECT dominio, valido, mensaje, expira FROM dns_cache"):
+            self._entradas[dominio] = (bool(valido), mensaje, expira)
+        atexit.register(self.guardar)
+
+    def _persistir(self, dominio, entrada):
+        # Se llama con el lock tomado
+        if self._conexion is None:
+            return
+        valido, mensaje, expira = entrada
+        self._conexion.execute(
+            "INSERT OR REPLACE INTO dns_cache (dominio, valido, mensaje, expira) VALUES (?, ?, ?, ?)",
+            (dominio, int(valido), mensaje, expira)
+        )
+        self._pendientes += 1
+        if self._pendientes >= SQLITE_COMMIT_EVERY:
+            self._conexion.commit()
+            self._pendientes = 0
+
+    def guardar(self):
+        """Confirma en disco las entradas pendientes."""
+        with self._lock:
+            if self._conexion is not None and self._pendientes:
+                self._conexion.commit()
+                self._pendientes = 0
+
+    # ---------------------------------------------------------
+    # Resolución
+    # ---------------------------------------------------------
+    def _ttl(self, answers):
+        try:
+            ttl = answers.rrset.ttl
+        except AttributeError:
+            ttl = self.min_ttl
+        return min(max(ttl, self.min_ttl), self.max_ttl)
+
+    def _resolver(self, dominio):
+        """
+        Consulta MX y, si no hay, A.
+        Devuelve (valido, mensaje, ttl); ttl=None si el resultado no debe guardarse.
+        """
+        transitorio = False
+        try:
+            answers = self.resolver.resolve(dominio, 'MX')
+            if answers:
+                return True, "Email válido (MX)", self._ttl(answers)
+        except dns.resolver.NXDOMAIN:
+            # El dominio no existe: tampoco tendrá registro A
+            return False, "No se encontraron registros DNS", self.negative_ttl
+        except dns.resolver.NoAnswer:
+            pass
+        except Exception:
+            # Timeout, servidores sin respuesta...: no es una respuesta definitiva
+            transitorio = True
+
+        try:
+            answers = self.resolver.resolve(dominio, 'A')
+            if answers:
+                return True, "Email válido (A)", self._ttl(answers)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return False, "No se encontraron registros DNS", None if transitorio else self.negative_ttl
+        except Exception:
+            return False, "No se encontraron registros DNS", None
+
+        return False, "Validación DNS fallida", None if transitorio else self.negative_ttl
+
+    def consultar(self, dominio):
+        """
+        Devuelve (valido, mensaje) para el dominio, usando la caché si la entrada sigue vigente.
+        """
+        dominio = dominio.strip().lower().rstrip('.')
+        ahora = time.time()
+        with self._lock:
+            entrada = self._entradas.get(dominio)
+            if entrada and entrada[2] > ahora:
+                self.hits += 1
+                if not entrada[0]:
+                    self.negative_hits += 1
+                return entrada[0], entrada[1]
+            self.misses += 1
+
+        # La consulta se hace fuera del lock para no bloquear al resto de hilos
+        valido, mensaje, ttl = self._resolver(dominio)
+
+        with self._lock:
+            if ttl is None:
+                self.errores_transitorios += 1
+            else:
+                entrada = (valido, mensaje, time.time() + ttl)
+                self._entradas[dominio] = entrada
+                self._persistir(dominio, entrada)
+        return valido, mensaje
+
+    def estadisticas(self):
+        """Contadores de aciertos/fallos de la caché."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "transient_errors": self.errores_transitorios,
+                "entries": len(self._entradas),
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def obtener_cache_dns():
+    """Devuelve la caché DNS compartida por el proceso (se crea en el primer uso)."""
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = CacheDNS()
+    return _CACHE
@@ -1,11 +1,17 @@
 #!/usr/bin/env python3
-import dns.resolver
 from email_validator import validate_email, EmailNotValidError
 from colorama import Fore
-
-def validate_email_address(email):
+from exclusions import MatcherExclusiones
+from dns_cache import obtener_cache_dns
+
+def validate_email_format(email):
+    """
+    Valida solo el formato (sin DNS).
+    Devuelve (True, dominio) o (False, mensaje de error).
+    """
     try:
-        valid = validate_email(email)
+        # Sin comprobación de entregabilidad: la parte DNS se resuelve aparte con caché
+        valid = validate_email(email, check_deliverability=False)
         email = valid.email
     except EmailNotValidError as e:
         return False, f"Formato inválido: {str(e)}"
@@ -14,31 +20,36 @@ def validate_email_address(email):
         domain = email.split('@')[-1]
     except Exception:
         return False, "No se pudo extraer el dominio"
+    return True, domain
 
-    try:
-        answers = dns.resolver.resolve(domain, 'MX')
-        if answers:
-            return True, "Email válido (MX)"
-    except Exception:
-        pass
+def validate_email_address(email):
+    is_valid, domain = validate_email_format(email)
+    if not is_valid:
+        return False, domain
 
-    try:
-        answers = dns.resolver.resolve(domain, 'A')
-        if answers:
-            return True, "Email válido (A)"
-    except Exception:
-        return False, "No se encontraron registros DNS"
+    # Resolución MX/A con caché por dominio (compartida entre hilos y ejecuciones)
+    return obtener_cache_dns().consultar(domain)
 
-    return False, "Validación DNS fallida"
+def filtrar_emails(emails, exclusiones, validar_dns=True):
+    # 'exclusiones' suele ser el MatcherExclusiones de cargar_exclusiones();
+    # si llega un set de palabras se compila aquí.
+    # Con validar_dns=False solo se comprueba el formato: la parte DNS la hace
+    # después processors.validacion_emails para todo el archivo a la vez.
+    if not isinstance(exclusiones, MatcherExclusiones):
+        exclusiones = MatcherExclusiones.desde_palabras(exclusiones)
 
-def filtrar_emails(emails, exclusiones):
     emails_validos = []
     for email in emails:
-        if any(excl in email.lower() for excl in exclusiones):
-            print(Fore.RED + f"🚫 EMAIL EXCLUIDO: {email}")
+        coincidencia = exclusiones.buscar(email)
+        if coincidencia:
+            lista, palabra = coincidencia
+            print(Fore.RED + f"🚫 EMAIL EXCLUIDO ({lista}: '{palabra}'): {email}")
             continue
 
-        is_valid, msg = validate_email_address(email)
+        if validar_dns:
+            is_valid, msg = validate_email_address(email)
+        else:
+            is_valid, msg = validate_email_format(email)
         if not is_valid:
             print(Fore.RED + f"🚫 EMAIL INVÁLIDO ({msg}): {email}")
             continue
@@ -1,21 +1,152 @@
 #!/usr/bin/env python3
 import os
+from collections import deque
 from colorama import Fore
 from configuracion import EXCLUSIONES_FOLDER
 
+
+class MatcherExclusiones:
+    """
+    Autómata de Aho-Corasick con todas las palabras de exclusión.
+
+    Se construye una vez al cargar las listas y después comprueba un email en
+    tiempo proporcional a su longitud, sin importar cuántas palabras haya.
+    Indica qué palabra y de qué lista (nombre del .txt) ha coincidido.
+
+    Se comporta también como un conjunto de palabras (len, in, iteración)
+    para no romper el código que trataba las exclusiones como un set.
+    """
+
+    def __init__(self):
+        # Nodo 0 = raíz. Para cada nodo: transiciones, enlace de fallo y salidas
+        self._goto = [{}]
+        self._fallo = [0]
+        self._salida = [None]        # palabra que termina exactamente en este nodo
+        self._enlace_salida = [0]    # nodo más cercano (por fallos) con salida; 0 = ninguno
+        self._listas = {}            # palabra -> [listas donde aparece]
+        self._compilado = True
+
+    @classmethod
+    def desde_palabras(cls, palabras, lista="exclusiones"):
+        """Crea un matcher a partir de cualquier iterable de palabras."""
+        matcher = cls()
+        for palabra in palabras:
+            matcher.agregar(palabra, lista)
+        matcher.compilar()
+        return matcher
+
+    def agregar(self, palabra, lista):
+        """Añade una palabra (en minúsculas) perteneciente a 'lista'."""
+        palabra = palabra.strip().lower()
+        if not palabra:
+            return
+        listas = self._listas.setdefault(palabra, [])
+        if lista not in listas:
+            listas.append(lista)
+        if len(listas) > 1:
+            return  # ya estaba en el autómata
+
+        nodo = 0
+        for caracter in palabra:
+            siguiente = self._goto[nodo].get(caracter)
+            if siguiente is None:
+                siguiente = len(self._goto)
+                self._goto.append({})
+                self._fallo.append(0)
+                self._salida.append(None)
+                self._enlace_salida.append(0)
+                self._goto[nodo][caracter] = siguiente
+            nodo = siguiente
+        self._salida[nodo] = palabra
+        self._compilado = False
+
+    def compilar(self):
+        """Calcula los enlaces de fallo y de salida (recorrido en anchura)."""
+        cola = deque()
+        for siguiente in self._goto[0].values():
+            self._fallo[siguiente] = 0
+            self._enlace_salida[siguiente] = 0
+            cola.append(siguiente)
+
+        while cola:
+            nodo = cola.popleft()
+            for caracter, siguiente in self._goto[nodo].items():
+                cola.append(siguiente)
+                fallo = self._fallo[nodo]
+                while fallo and caracter not in self._goto[fallo]:
+                    fallo = self._fallo[fallo]
+                fallo = self._goto[fallo].get(caracter, 0)
+                self._fallo[siguiente] = fallo
+                self._enlace_salida[siguiente] = fallo if self._salida[fallo] else self._enlace_salida[fallo]
+
+        self._compilado = True
+
+    def _recorrer(self, texto):
+        """Genera (nodo_con_salida) por cada palabra encontrada en 'texto'."""
+        if not self._compilado:
+            self.compilar()
+        goto = self._goto
+        fallo = self._fallo
+        salida = self._salida
+        enlace_salida = self._enlace_salida
+
+        nodo = 0
+        for caracter in texto:
+            while nodo and caracter not in goto[nodo]:
+                nodo = fallo[nodo]
+            nodo = goto[nodo].get(caracter, 0)
+
+            encontrado = nodo if salida[nodo] else enlace_salida[nodo]
+            while encontrado:
+                yield encontrado
+                encontrado = enlace_salida[encontrado]
+
+    def buscar(self, texto):
+        """
+        Devuelve (lista, palabra) de la primera palabra de exclusión contenida
+        en 'texto', o None si no contiene ninguna.
+        """
+        for nodo in self._recorrer(texto.lower()):
+            palabra = self._salida[nodo]
+            return self._listas[palabra][0], palabra
+        return None
+
+    def buscar_todas(self, texto):
+        """Devuelve todas las coincidencias (lista, palabra) presentes en 'texto'."""
+        coincidencias = []
+        for nodo in self._recorrer(texto.lower()):
+            palabra = self._salida[nodo]
+            for lista in self._listas[palabra]:
+                coincidencias.append((lista, palabra))
+        return coincidencias
+
+    def __len__(self):
+        return len(self._listas)
+
+    def __iter__(self):
+        return iter(self._listas)
+
+    def __contains__(self, palabra):
+        return palabra in self._listas
+
+
 def cargar_exclusiones():
-    exclusiones = set()
+    """
+    Carga las palabras de 'xclusiones/*.txt' y devuelve un MatcherExclusiones ya compilado.
+    El nombre de cada archivo (sin .txt) identifica la lista a la que pertenece cada palabra.
+    """
+    exclusiones = MatcherExclusiones()
     if not os.path.exists(EXCLUSIONES_FOLDER) or not os.listdir(EXCLUSIONES_FOLDER):
         print(Fore.RED + f"🚨 La carpeta '{EXCLUSIONES_FOLDER}' está vacía. No se aplicarán exclusiones.")
         return exclusiones
 
-    for file in os.listdir(EXCLUSIONES_FOLDER):
+    for file in sorted(os.listdir(EXCLUSIONES_FOLDER)):
         file_path = os.path.join(EXCLUSIONES_FOLDER, file)
         if os.path.isfile(file_path) and file.endswith(".txt"):
+            lista = file[:-len(".txt")]
             with open(file_path, "r", encoding="utf-8") as f:
                 for line in f:
-                    palabra = line.strip().lower()
-                    if palabra:
-                        exclusiones.add(palabra)
+                    exclusiones.agregar(line, lista)
+    exclusiones.compilar()
     print(Fore.GREEN + f"✅ Exclusiones cargadas: {len(exclusiones)} palabras clave.")
     return exclusiones
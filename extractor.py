@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+extractor.py
+
+Extractor de una sola pasada para el HTML descargado por el crawler.
+
+En lugar de recorrer la página una vez por cada expresión regular (emails, 7 redes
+sociales y enlaces <a href>), se hace un único recorrido buscando los "anclajes"
+de cada tipo de dato ('@', 'http://', 'https://', '<a ') y solo en esas posiciones
+se aplica la expresión regular completa correspondiente.
+
+Ejecutar 'python extractor.py' lanza un micro-benchmark contra el método anterior
+(un re.findall por patrón) y comprueba que ambos devuelven lo mismo.
+"""
+
+import html
+import re
+from collections import namedtuple
+
+# Expresiones regulares (SIN grupos de captura) para redes sociales
+SOCIAL_REGEX = {
+    'Instagram': r'https?:\/\/(?:www\.)?instagram\.com\/(?!about|explore|developer|legal|press|privacy|terms|accounts|directory|p\/|reel\/|stories\/)[A-Za-z0-9_.]{1,30}(?:\/)?',
+    'Facebook':  r'https?:\/\/(?:[a-z0-9-]+\.)*facebook\.com\/(?!pages|groups|events|help|policies|marketplace|watch|live|settings|messages|notifications|bookmarks|memories|fundraisers|games|jobs|privacy|terms|login|dialog|plugins|tr\/?|sharer(?:\.php)?\/?)[A-Za-z0-9.]{5,50}(?:\/)?',
+    'YouTube':   r'https?:\/\/(?:www\.)?youtube\.com\/(?:c\/|channel\/|user\/|@)[A-Za-z0-9_\-]{1,50}(?:\/)?',
+    'LinkedIn':  r'https?:\/\/(?:[a-z]{2,3}\.)?linkedin\.com\/(?:company\/|in\/)[A-Za-z0-9_\-]{1,50}(?:\/)?',
+    'Twitter':   r'https?:\/\/(?:www\.)?(?:x\.com|twitter\.com)\/(?!home|explore|notifications|messages|intent|share|search)[A-Za-z0-9_]{1,15}(?:\/)?',
+    'TikTok':    r'https?:\/\/(?:www\.)?tiktok\.com\/@(?!live|discover|tag|music|video)[A-Za-z0-9_.\-]{1,24}(?:\/)?',
+    'Pinterest': r'https?:\/\/(?:www\.)?pinterest\.com\/(?!pin|explore|topics|login|signup|categories|about)[A-Za-z0-9_.\-\/]+'
+}
+
+# Expresión regular para correos electrónicos (sin grupos de captura)
+EMAIL_REGEX = r'[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}'
+
+# Expresión regular para enlaces <a href="..."> (un grupo: el valor del href)
+HREF_REGEX = r'<a\s+[^>]*href=["\']([^"\']+)["\']'
+
+# Bytes máximos que se leen como texto de un enlace (entre el '>' de <a ...> y '</a')
+MAX_ANCHOR_TEXT = 300
+
+# Longitud máxima de la parte local que se busca hacia atrás desde la '@'.
+# Si la secuencia es más larga se considera basura (base64, JS minificado...).
+MAX_LOCAL_PART = 256
+
+_SOCIAL_PREFIX = r'https?:\/\/'
+
+ResultadoExtraccion = namedtuple('ResultadoExtraccion', ['emails', 'social_links', 'enlaces', 'textos'])
+
+_TEXTO_ANCLA = re.compile(rb'[^>]*>(.{0,%d}?)</a' % MAX_ANCHOR_TEXT, re.IGNORECASE | re.DOTALL)
+_ETIQUETA = re.compile(rb'<[^>]*>')
+
+
+def texto_enlace(content: bytes, fin_href: int) -> str:
+    """
+    Texto visible del enlace cuyo href termina en 'fin_href' ("" si el enlace
+    no se cierra en MAX_ANCHOR_TEXT bytes). Sin etiquetas internas, con las
+    entidades HTML resueltas y los espacios normalizados.
+    """
+    m = _TEXTO_ANCLA.match(content, fin_href)
+    if not m or not m.group(1):
+        return ""
+    texto = _ETIQUETA.sub(b' ', m.group(1)).decode('utf-8', errors='replace')
+    return ' '.join(html.unescape(texto).split())
+
+
+def _compilar_sociales():
+    """
+    Une los patrones de SOCIAL_REGEX en uno solo con un grupo con nombre por red:
+    https?://(?:(?P<Instagram>...)|(?P<Facebook>...)|...)
+    """
+    alternativas = []
+    for platform, pattern in SOCIAL_REGEX.items():
+        if not pattern.startswith(_SOCIAL_PREFIX):
+            raise ValueError(f"El patrón de {platform} debe empezar por {_SOCIAL_PREFIX}")
+        alternativas.append(f"(?P<{platform}>{pattern[len(_SOCIAL_PREFIX):]})")
+    combinado = _SOCIAL_PREFIX + "(?:" + "|".join(alternativas) + ")"
+    return re.compile(combinado.encode('ascii'), re.IGNORECASE)
+
+
+class ExtractorPagina:
+    """
+    Extrae emails, enlaces a redes sociales y href (con el texto de cada enlace)
+    de un documento en bytes recorriéndolo una sola vez. Todos los patrones se compilan al crear el objeto.
+
+    El resultado es el mismo que aplicar re.findall con EMAIL_REGEX, cada SOCIAL_REGEX
+    y HREF_REGEX por separado (coincidencias sin solapamiento dentro de cada patrón).
+    """
+
+    def __init__(self):
+        self._social = _compilar_sociales()
+        self._href = re.compile(HREF_REGEX.encode('ascii'), re.IGNORECASE)
+        self._email_local = re.compile(rb'[a-zA-Z0-9._%+\-]+')
+        self._email_domain = re.compile(rb'[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}')
+        # Patrones de anclaje según qué datos pueden aparecer en la página
+        self._anclajes = {}
+        for email in (False, True):
+            for social in (False, True):
+                for href in (False, True):
+                    partes = []
+                    if email:
+                        partes.append(rb'@')
+                    if social:
+                        partes.append(rb'[hH][tT][tT][pP][sS]?://')
+                    if href:
+                        partes.append(rb'<[aA]\s')
+                    if partes:
+                        self._anclajes[(email, social, href)] = re.compile(b'|'.join(partes))
+
+    def extraer(self, content: bytes, con_enlaces: bool = True) -> ResultadoExtraccion:
+        """
+        Devuelve un ResultadoExtraccion con:
+          - emails: lista de emails encontrados (en orden de aparición),
+          - social_links: {red: [urls]} para cada red de SOCIAL_REGEX,
+          - enlaces: valores de href (vacío si con_enlaces=False),
+          - textos: texto visible de cada enlace, en el mismo orden que 'enlaces'.
+        Solo se decodifican las coincidencias, nunca el documento completo.
+        """
+        emails = []
+        social_links = {platform: [] for platform in SOCIAL_REGEX}
+        enlaces = []
+        textos = []
+
+        # Prefiltros literales: si no hay '@', 'http' o '<a' no se busca ese tipo de dato
+        clave = (
+            b'@' in content,
+            b'://' in content,
+            con_enlaces and (b'<a' in content or b'<A' in content),
+        )
+        anclaje = self._anclajes.get(clave)
+        if anclaje is None:
+            return ResultadoExtraccion(emails, social_links, enlaces, textos)
+
+        fin_email = 0   # final de la última coincidencia de email (sin solapamientos)
+        fin_href = 0    # ídem para href
+        fin_social = dict.fromkeys(SOCIAL_REGEX, 0)  # ídem para cada red
+
+        for m in anclaje.finditer(content):
+            pos = m.start()
+            caracter = content[pos]
+
+            if caracter == 0x40:  # '@'
+                # Parte local: secuencia de caracteres válidos justo antes de la '@'
+                inicio_ventana = max(fin_email, pos - MAX_LOCAL_PART - 1)
+                ventana = content[inicio_ventana:pos][::-1]
+                local = self._email_local.match(ventana)
+                if not local:
+                    continue
+                inicio = pos - local.end()
+                if inicio == inicio_ventana and inicio_ventana > fin_email:
+                    # La secuencia continúa más allá de la ventana: no es un email real
+                    continue
+                dominio = self._email_domain.match(content, pos + 1)
+                if dominio:
+                    emails.append(content[inicio:dominio.end()].decode('ascii'))
+                    fin_email = dominio.end()
+
+            elif caracter == 0x3C:  # '<'
+                if pos < fin_href:
+                    continue
+                href = self._href.match(content, pos)
+                if href:
+                    enlaces.append(href.group(1).decode('utf-8', errors='replace'))
+                    textos.append(texto_enlace(content, href.end()))
+                    fin_href = href.end()
+
+            else:  # 'http://' o 'https://'
+                social = self._social.match(content, pos)
+                if social and pos >= fin_social[social.lastgroup]:
+                    social_links[social.lastgroup].append(social.group(0).decode('ascii'))
+                    fin_social[social.lastgroup] = social.end()
+
+        return ResultadoExtraccion(emails, social_links, enlaces, textos)
+
+
+def extraer_por_regex(content: bytes, con_enlaces: bool = True) -> ResultadoExtraccion:
+    """
+    Método anterior (una pasada completa por cada patrón). Se mantiene como
+    referencia para el benchmark y para comprobar que ambos coinciden.
+    """
+    emails = [em.decode('ascii') for em in re.findall(EMAIL_REGEX.encode('ascii'), content, flags=re.IGNORECASE)]
+    social_links = {
+        platform: [m.decode('ascii') for m in re.findall(pattern.encode('ascii'), content, flags=re.IGNORECASE)]
+        for platform, pattern in SOCIAL_REGEX.items()
+    }
+    enlaces = []
+    textos = []
+    if con_enlaces:
+        for m in re.finditer(HREF_REGEX.encode('ascii'), content, flags=re.IGNORECASE):
+            enlaces.append(m.group(1).decode('utf-8', errors='replace'))
+            textos.append(texto_enlace(content, m.end()))
+    return ResultadoExtraccion(emails, social_links, enlaces, textos)
+
+
+def _pagina_de_prueba(repeticiones: int) -> bytes:
+    """Genera un HTML sintético parecido a una web corporativa."""
+    bloque = (
+        '<div class="menu"><a href="/contacto">Contacto</a> <a class="x" href="/blog/post-{i}">Blog</a></div>\n'
+        '<p>Escríbenos a info{i}@empresa.es o a ventas@empresa.com. Tel: 600 000 000.</p>\n'
+        '<a href="https://www.instagram.com/empresa{i}/">IG</a> <a href="https://facebook.com/empresa.oficial">FB</a>\n'
+        '<script>var s="https://www.youtube.com/@canal{i}"; var t="abcdefghijklmnopqrstuvwxyz0123456789";</script>\n'
+        '<img src="data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg==">\n'
+        '<footer>https://x.com/empresa_{i} https://www.linkedin.com/company/empresa-{i}</footer>\n'
+    )
+    return ''.join(bloque.format(i=i) for i in range(repeticiones)).encode('utf-8')
+
+
+def benchmark(repeticiones: int = 2000, vueltas: int = 5):
+    """
+    Compara el extractor de una pasada con el método de un findall por patrón.
+    """
+    import timeit
+
+    content = _pagina_de_prueba(repeticiones)
+    extractor = ExtractorPagina()
+
+    if extractor.extraer(content) != extraer_por_regex(content):
+        raise AssertionError("El extractor no devuelve lo mismo que el método por regex")
+
+    t_regex = min(timeit.repeat(lambda: extraer_por_regex(content), number=1, repeat=vueltas))
+    t_unico = min(timeit.repeat(lambda: extractor.extraer(content), number=1, repeat=vueltas))
+
+    print(f"Documento: {len(content) / 1024:.0f} KB")
+    print(f"Un findall por patrón: {t_regex * 1000:.1f} ms")
+    print(f"Extractor una pasada:  {t_unico * 1000:.1f} ms")
+    print(f"Mejora: x{t_regex / t_unico:.1f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+geocodificador.py
+
+Capa de geocodificación para la normalización de direcciones:
+  - Caché persistente (SQLite) indexada por la dirección normalizada, con TTL.
+  - Deduplicación de direcciones idénticas antes de consultar.
+  - Cola con límite de ritmo (Nominatim permite 1 petición por segundo).
+  - Backend intercambiable: Nominatim en producción, cualquier objeto con
+    'geocodificar(direccion)' en pruebas.
+
+Los resultados son tuplas (street, postal_code, locality, province, country),
+igual que query_osm_nominatim.
+"""
+
+import atexit
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import requests
+from configuracion import GEOCODING_CACHE_FILE
+from http_pool import get_session
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_USER_AGENT = "CentralCompanies/1.0"
+NOMINATIM_TIMEOUT = 15            # segundos por petición
+NOMINATIM_MIN_INTERVAL = 1.0      # segundos entre peticiones (política de uso de Nominatim)
+
+GEOCODING_TTL = 90 * 24 * 3600          # resultados encontrados: 90 días
+GEOCODING_NEGATIVE_TTL = 7 * 24 * 3600  # direcciones sin resultado: 7 días
+SQLITE_COMMIT_EVERY = 50
+
+RESULTADO_VACIO = (None, None, None, None, None)
+
+
+def normalizar_clave(direccion):
+    """
+    Clave de caché de una dirección: minúsculas, sin tildes, sin signos
+    de puntuación sobrantes y con los espacios colapsados.
+    """
+    if not isinstance(direccion, str):
+        return ""
+    texto = unicodedata.normalize("NFKD", str(direccion))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = re.sub(r"[^\w,]+", " ", texto)
+    texto = re.sub(r"\s*,\s*", ", ", texto)
+    return re.sub(r"\s+", " ", texto).strip(" ,")
+
+
+class LimitadorRitmo:
+    """Garantiza un intervalo mínimo entre peticiones, aunque lleguen desde varios hilos."""
+
+    def __init__(self, intervalo=NOMINATIM_MIN_INTERVAL):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._siguiente = 0.0
+
+    def esperar(self):
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora < self._siguiente:
+                time.sleep(self._siguiente - ahora)
+                ahora = self._siguiente
+            self._siguiente = ahora + self.intervalo
+
+
+class BackendNominatim:
+    """Backend real: consulta la API pública de Nominatim respetando 1 petición/segundo."""
+
+    def __init__(self, url=NOMINATIM_URL, timeout=NOMINATIM_TIMEOUT, limitador=None):
+        self.url = url
+        self.timeout = timeout
+        self.limitador = limitador or LimitadorRitmo()
+
+    def geocodificar(self, direccion):
+        """
+        Devuelve (street, postal_code, locality, province, country) o RESULTADO_VACIO.
+        Lanza requests.RequestException ante errores de red (no se cachean).
+        """
+        params = {
+            "q": direccion,
+            "format": "json",
+            "addressdetails": 1,
+            "limit": 1,
+        }
+        self.limitador.esperar()
+        response = get_session().get(self.url, params=params, timeout=self.timeout,
+                                     headers={"User-Agent": NOMINATIM_USER_AGENT})
+        response.raise_for_status()
+        data = response.json()
+
+        if not data:
+            return RESULTADO_VACIO
+
+        address_data = data[0]["address"]
+        street = address_data.get("road", "")
+        postal_code = address_data.get("postcode", "")
+        locality = address_data.get("city", address_data.get("town", address_data.get("village", "")))
+        province = address_data.get("state", "")
+        country = address_data.get("country_code", "").upper()
+
+        return street, postal_code, locality, province, country
+
+
+class CacheGeocodificacion:
+    """Caché en memoria + SQLite de resultados de geocodificación, segura entre hilos."""
+
+    def __init__(self, ruta=GEOCODING_CACHE_FILE, ttl=GEOCODING_TTL, negative_ttl=GEOCODING_NEGATIVE_TTL):
+        self.ruta = ruta
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._conexion = None
+        self._pendientes = 0
+        self.hits = 0
+        self.misses = 0
+        if ruta:
+            self._abrir_sqlite()
+
+    def _abrir_sqlite(self):
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS geocoding_cache (clave TEXT PRIMARY KEY, resultado TEXT, expira REAL)"
+        )
+        self._conexion.execute("DELETE FROM geocoding_cache WHERE expira <= ?", (time.time(),))
+        self._conexion.commit()
+        for clave, resultado, expira in self._conexion.execute(
+                "SELECT clave, resultado, expira FROM geocoding_cache"):
+            self._entradas[clave] = (tuple(json.loads(resultado)), expira)
+        atexit.register(self.guardar)
+
+    def obtener(self, clave):
+        """Devuelve el resultado cacheado o None si no hay entrada vigente."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada and entrada[1] > time.time():
+                self.hits += 1
+                return entrada[0]
+            self.misses += 1
+            return None
+
+    def guardar_resultado(self, clave, resultado):
+        ttl = self.ttl if any(resultado) else self.negative_ttl
+        entrada = (tuple(resultado), time.time() + ttl)
+        with self._lock:
+            self._entradas[clave] = entrada
+            if self._conexion is not None:
+                self._conexion.execute(
+                    "INSERT OR REPLACE INTO geocoding_cache (clave, resultado, expira) VALUES (?, ?, ?)",
+                    (clave, json.dumps(list(entrada[0]), ensure_ascii=False), entrada[1])
+                )
+                self._pendientes += 1
+                if self._pendientes >= SQLITE_COMMIT_EVERY:
+                    self._conexion.commit()
+                    self._pendientes = 0
+
+    def guardar(self):
+        """Confirma en disco las entradas pendientes."""
+        with self._lock:
+            if self._conexion is not None and self._pendientes:
+                self._conexion.commit()
+                self._pendientes = 0
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entradas),
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class Geocodificador:
+    """
+    Punto de entrada de la geocodificación: caché + deduplicación + backend con límite de ritmo.
+    Las peticiones simultáneas para la misma dirección se agrupan en una sola.
+    """
+
+    def __init__(self, backend=None, cache=None):
+        self.backend = backend or BackendNominatim()
+        self.cache = cache if cache is not None else CacheGeocodificacion()
+        self._lock = threading.Lock()
+        self._en_curso = {}  # clave -> threading.Event
+
+    def geocodificar(self, direccion):
+        """Geocodifica una dirección usando la caché; devuelve la tupla de 5 campos."""
+        clave = normalizar_clave(direccion)
+        if not clave:
+            return RESULTADO_VACIO
+
+        while True:
+            resultado = self.cache.obtener(clave)
+            if resultado is not None:
+                return resultado
+            with self._lock:
+                evento = self._en_curso.get(clave)
+                if evento is None:
+                    evento = threading.Event()
+                    self._en_curso[clave] = evento
+                    propietario = True
+                else:
+                    propietario = False
+            if propietario:
+                break
+            # Otro hilo ya está consultando esta dirección: esperar su resultado
+            evento.wait()
+            resultado = self.cache.obtener(clave)
+            if resultado is not None:
+                return resultado
+            return RESULTADO_VACIO
+
+        try:
+            resultado = tuple(self.backend.geocodificar(direccion))
+            self.cache.guardar_resultado(clave, resultado)
+            return resultado
+        except requests.RequestException as e:
+            print(f"Error en OpenStreetMap: {e}")
+            return RESULTADO_VACIO
+        finally:
+            with self._lock:
+                self._en_curso.pop(clave, None)
+            evento.set()
+
+    def geocodificar_lote(self, direcciones):
+        """
+        Geocodifica una colección de direcciones (p. ej. una columna de un DataFrame)
+        consultando cada dirección distinta una sola vez.
+        Devuelve un dict {direccion: resultado}.
+        """
+        unicas = {}
+        for direccion in direcciones:
+            if not isinstance(direccion, str) or direccion in unicas:
+                continue
+            unicas[direccion] = normalizar_clave(direccion)
+
+        por_clave = {}
+        for direccion, clave in unicas.items():
+            if clave not in por_clave:
+                por_clave[clave] = self.geocodificar(direccion)
+        return {direccion: por_clave.get(clave, RESULTADO_VACIO) for direccion, clave in unicas.items()}
+
+
+_GEOCODIFICADOR = None
+_GEOCODIFICADOR_LOCK = threading.Lock()
+
+
+def obtener_geocodificador():
+    """Geocodificador compartido por el proceso (se crea en el primer uso)."""
+    global _GEOCODIFICADOR
+    if _GEOCODIFICADOR is None:
+        with _GEOCODIFICADOR_LOCK:
+            if _GEOCODIFICADOR is None:
+                _GEOCODIFICADOR = Geocodificador()
+    return _GEOCODIFICADOR
+
+
+def configurar_backend(backend, cache=None):
+    """
+    Sustituye el backend del geocodificador compartido (p. ej. por uno local en pruebas).
+    Con cache=None se usa una caché solo en memoria, para que los resultados de
+    ese backend no acaben en la caché persistente (GEOCODING_CACHE_FILE); para
+    usarla hay que pasarla explícitamente: cache=CacheGeocodificacion().
+    """
+    global _GEOCODIFICADOR
+    if cache is None:
+        cache = CacheGeocodificacion(ruta=None)
+    with _GEOCODIFICADOR_LOCK:
+        _GEOCODIFICADOR = Geocodificador(backend=backend, cache=cache)
+    return _GEOCODIFICADOR
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+http_pool.py
+
+Pool de sesiones HTTP keep-alive compartido por el crawler y el cliente de la API PHP.
+
+Cada hilo obtiene su propia requests.Session (las sesiones no son seguras entre hilos),
+pero todas montan los mismos HTTPAdapter, de modo que las conexiones TCP/TLS abiertas
+se reutilizan entre hilos. El tamaño del pool se ajusta al número de workers y se
+pueden fijar límites por host (por ejemplo, para centralapi.site).
+"""
+
+import threading
+import weakref
+import requests
+from requests.adapters import HTTPAdapter
+
+# Conexiones por host que se mantienen abiertas por defecto
+DEFAULT_POOL_SIZE = 10
+# Número de hosts distintos cuyos pools se guardan a la vez
+DEFAULT_POOL_HOSTS = 100
+# Límites específicos por host: {host: max_conexiones}
+HOST_POOL_LIMITS = {
+    "centralapi.site": 10,
+}
+
+
+class SessionPool:
+    """
+    Reparte sesiones keep-alive seguras entre hilos que comparten el mismo pool de conexiones.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, pool_hosts=DEFAULT_POOL_HOSTS, host_limits=None):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pool_hosts = pool_hosts
+        self._host_limits = dict(HOST_POOL_LIMITS if host_limits is None else host_limits)
+        self._pool_size = pool_size
+        self._generation = 0
+        self._retired = []    # [(generación, adaptador)] sustituidos que alguna sesión puede seguir montando
+        self._sessions = weakref.WeakKeyDictionary()  # sesión -> generación de sus adaptadores
+        self._closed = {}     # host -> contadores de los adaptadores ya cerrados (para stats)
+        self._build_adapters()
+
+    def _build_adapters(self):
+        """Crea los adaptadores compartidos (uno general y uno por host limitado)."""
+        self._default_adapter = HTTPAdapter(pool_connections=self._pool_hosts,
+                                            pool_maxsize=self._pool_size)
+        self._host_adapters = {}
+        for host, limit in self._host_limits.items():
+            # pool_block=True: nunca se abren más de 'limit' conexiones contra ese host
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=limit, pool_block=True)
+            self._host_adapters[host] = adapter
+        self._generation += 1
+
+    def _retire_adapters(self):
+        # Se llama con el lock tomado, justo antes de _build_adapters
+        for adapter in [self._default_adapter] + list(self._host_adapters.values()):
+            self._retired.append((self._generation, adapter))
+
+    def _close_unused(self):
+        """
+        Cierra los adaptadores retirados que ya no monta ninguna sesión viva
+        (todas se han vuelto a montar con una generación posterior o han desaparecido).
+        Se llama con el lock tomado.
+        """
+        in_use = min(self._sessions.values(), default=self._generation)
+        keep = []
+        for generation, adapter in self._retired:
+            if generation >= in_use:
+                keep.append((generation, adapter))
+                continue
+            for host, entry in self._pool_counters(adapter).items():
+                closed = self._closed.setdefault(host, {"requests": 0, "connections_created": 0})
+                closed["requests"] += entry["requests"]
+                closed["connections_created"] += entry["connections_created"]
+            adapter.close()
+        self._retired = keep
+
+    @staticmethod
+    def _pool_counters(adapter):
+        """Contadores por host de los pools de un adaptador."""
+        hosts = {}
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            entry = hosts.setdefault(pool.host, {"requests": 0, "connections_created": 0, "open_connections": 0})
+            entry["requests"] += pool.num_requests
+            entry["connections_created"] += pool.num_connections
+            # Conexiones devueltas al pool que siguen abiertas (keep-alive)
+            if pool.pool is not None:
+                entry["open_connections"] += sum(1 for conn in list(pool.pool.queue)
+                                                 if conn is not None and conn.sock is not None)
+        return hosts
+
+    def _mount(self, session):
+        session.mount("http://", self._default_adapter)
+        session.mount("https://", self._default_adapter)
+        for host, adapter in self._host_adapters.items():
+            # Con la barra final el prefijo no abarca otros hosts ("centralapi.site.evil.com")
+            session.mount(f"http://{host}/", adapter)
+            session.mount(f"https://{host}/", adapter)
+
+    def session(self) -> requests.Session:
+        """
+        Devuelve la sesión del hilo actual, creándola si no existe.
+        Si el pool se ha redimensionado, vuelve a montar los adaptadores nuevos.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None or self._local.generation != self._generation:
+            with self._lock:
+                if session is None:
+                    session = requests.Session()
+                self._mount(session)
+                self._local.session = session
+                self._local.generation = self._generation
+                self._sessions[session] = self._generation
+                self._close_unused()
+        return session
+
+    def ensure_capacity(self, max_workers: int, host: str = None):
+        """
+        Garantiza que el pool admite al menos 'max_workers' conexiones simultáneas.
+        Si se indica 'host', solo se amplía el límite de ese host.
+        Nunca reduce el tamaño; las conexiones en curso terminan en los adaptadores
+        antiguos, que se cierran cuando ninguna sesión los monta ya.
+        """
+        with self._lock:
+            if host is not None:
+                if self._host_limits.get(host, 0) >= max_workers:
+                    return
+                self._host_limits[host] = max_workers
+            else:
+                if self._pool_size >= max_workers:
+                    return
+                self._pool_size = max_workers
+            self._retire_adapters()
+            self._build_adapters()
+            self._close_unused()
+
+    def set_host_limit(self, host: str, limit: int):
+        """Fija (o cambia) el número máximo de conexiones contra un host."""
+        with self._lock:
+            self._host_limits[host] = limit
+            self._retire_adapters()
+            self._build_adapters()
+            self._close_unused()
+
+    def stats(self) -> dict:
+        """
+        Estadísticas del pool:
+          - requests: peticiones enviadas
+          - connections_created: conexiones TCP/TLS abiertas en total
+          - reuse_ratio: fracción de peticiones que reutilizaron una conexión
+          - open_connections: conexiones keep-alive inactivas disponibles en el pool
+          - hosts: detalle por host
+        """
+        with self._lock:
+            adapters = [self._default_adapter] + list(self._host_adapters.values())
+            adapters += [adapter for _, adapter in self._retired]
+            hosts = {host: dict(closed, open_connections=0) for host, closed in self._closed.items()}
+
+        for adapter in adapters:
+            for host, counters in self._pool_counters(adapter).items():
+                entry = hosts.setdefault(host, {"requests": 0, "connections_created": 0, "open_connections": 0})
+                for name, value in counters.items():
+                    entry[name] += value
+
+        total_requests = sum(h["requests"] for h in hosts.values())
+        total_connections = sum(h["connections_created"] for h in hosts.values())
+        reuse_ratio = 0.0
+        if total_requests:
+            reuse_ratio = max(0.0, 1 - total_connections / total_requests)
+
+        return {
+            "requests": total_requests,
+            "connections_created": total_connections,
+            "reuse_ratio": round(reuse_ratio, 4),
+            "open_connections": sum(h["open_connections"] for h in hosts.values()),
+            "hosts": hosts,
+        }
+
+    def close(self):
+        """Cierra todas las conexiones del pool."""
+        with self._lock:
+            for adapter in [self._default_adapter] + list(self._host_adapters.values()):
+                adapter.close()
+            for _, adapter in self._retired:
+                adapter.close()
+            self._retired = []
+            self._build_adapters()
+
+
+# Pool compartido por todo el proceso
+_POOL = SessionPool()
+
+
+def get_session() -> requests.Session:
+    """Sesión keep-alive del hilo actual, conectada al pool compartido."""
+    return _POOL.session()
+
+
+def ensure_pool_capacity(max_workers: int, host: str = None):
+    """Ajusta el pool compartido al número de workers que lo van a usar."""
+    _POOL.ensure_capacity(max_workers, host)
+
+
+def pool_stats() -> dict:
+    """Estadísticas del pool compartido (reutilización, conexiones abiertas...)."""
+    return _POOL.stats()
@@ -2,97 +2,395 @@
 import re
 import json
 import os
-import requests
+import time
+import atexit
+import tempfile
+import threading
+import pandas as pd
+from geocodificador import NOMINATIM_URL, obtener_geocodificador
 
 # Ruta del archivo donde se almacenan los formatos aprendidos
 FORMATOS_FILE = "formatos_direcciones.json"
-NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+
+# Columnas que produce la normalización, en el orden de parse_address_by_country
+ADDRESS_COLUMNS = ["street", "postal_code", "locality", "province", "country"]
+
+# Escritura diferida de formatos aprendidos: se guarda en disco cada
+# FORMATOS_FLUSH_EVERY formatos nuevos o cada FORMATOS_FLUSH_INTERVAL segundos
+FORMATOS_FLUSH_EVERY = 20
+FORMATOS_FLUSH_INTERVAL = 30
+
+# Máximo de patrones guardados por país (se descartan los que menos aciertan)
+MAX_PATTERNS_PER_COUNTRY = 200
+
+# Códigos postales reconocibles sin conocer el país:
+#   ES/IT/FR/DE: 4-5 dígitos, PT: "1000-001", UK: "SW1A 2AA"
+POSTAL_CODE_REGEX = re.compile(
+    r"(?<![\w-])(?:\d{4}-\d{3}|\d{4,5}|[A-Za-z]{1,2}\d[A-Za-z\d]?\s\d[A-Za-z]{2})(?![\w-])"
+)
+
+
+# Firma estructural de una dirección: nº de segmentos separados por comas,
+# segmento que contiene el código postal y su posición dentro de él.
+# Las direcciones con la misma firma encajan en los mismos patrones.
+def firma_direccion(address):
+    if not isinstance(address, str):
+        return None
+    segmentos = [s.strip() for s in address.strip().split(",")]
+    for indice in range(len(segmentos) - 1, -1, -1):
+        coincidencias = list(POSTAL_CODE_REGEX.finditer(segmentos[indice]))
+        if coincidencias:
+            cp = coincidencias[-1]
+            antes = segmentos[indice][:cp.start()].strip()
+            despues = segmentos[indice][cp.end():].strip()
+            if antes and despues:
+                posicion = "med"
+            elif antes:
+                posicion = "fin"
+            elif despues:
+                posicion = "ini"
+            else:
+                posicion = "solo"
+            return f"{len(segmentos)}:{indice}:{posicion}"
+    return f"{len(segmentos)}:-"
+
+
+class RegistroFormatos:
+    """
+    Biblioteca de formatos de dirección compartida por todo el proceso.
+
+    - Lee 'formatos_direcciones.json' una sola vez.
+    - Guarda varios patrones generalizados por país, ya compilados e indexados
+      por firma (ver firma_direccion) para elegir rápido los candidatos.
+    - Cuenta los aciertos de cada patrón y prueba primero los que más aciertan.
+    - Los cambios se guardan en disco de forma diferida y atómica
+      (archivo temporal + os.replace), agrupando varias escrituras.
+    - Es seguro usarlo desde varios hilos.
+
+    Formato del JSON:
+      {"ES": {"patterns": [{"pattern", "groups", "signature", "hits"}, ...]}}
+    Las entradas antiguas {"pattern", "groups"} se convierten al cargar.
+    """
+
+    def __init__(self, ruta=FORMATOS_FILE, flush_every=FORMATOS_FLUSH_EVERY,
+                 flush_interval=FORMATOS_FLUSH_INTERVAL):
+        self.ruta = ruta
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._formatos = None
+        self._indice = {}  # país -> {firma: [(regex, grupos, entrada), ...]} de más a menos aciertos
+        self._pendientes = 0
+        self._sucio = False
+        self._ultimo_guardado = time.monotonic()
+        atexit.register(self.guardar)
+
+    def _cargar(self):
+        # Se llama con el lock tomado
+        if self._formatos is None:
+            datos = {}
+            if os.path.exists(self.ruta):
+                with open(self.ruta, "r", encoding="utf-8") as f:
+                    datos = json.load(f)
+            self._formatos = {pais: self._convertir(entrada) for pais, entrada in datos.items()}
+            self._indice = {}
+        return self._formatos
+
+    @staticmethod
+    def _convertir(entrada):
+        """Adapta una entrada antigua (un único patrón por país) al formato de biblioteca."""
+        if "patterns" in entrada:
+            return entrada
+        return {"patterns": [{
+            "pattern": entrada["pattern"],
+            "groups": list(entrada.get("groups", [])),
+            "signature": None,
+            "hits": 0,
+        }]}
+
+    def _indexar(self, country_code):
+        # Se llama con el lock tomado
+        if country_code in self._indice:
+            return self._indice[country_code]
+        por_firma = {}
+        for entrada in self._cargar().get(country_code, {}).get("patterns", []):
+            try:
+                regex = re.compile(entrada["pattern"])
+            except re.error:
+                continue
+            grupos = list(entrada.get("groups", []))
+            # Solo son utilizables los patrones con un grupo de captura por campo
+            if regex.groups != len(grupos):
+                continue
+            por_firma.setdefault(entrada.get("signature"), []).append((regex, grupos, entrada))
+        for candidatos in por_firma.values():
+            candidatos.sort(key=lambda c: c[2].get("hits", 0), reverse=True)
+        self._indice[country_code] = por_firma
+        return por_firma
+
+    def formatos(self):
+        """Copia del diccionario completo de formatos {país: datos}."""
+        with self._lock:
+            return json.loads(json.dumps(self._cargar()))
+
+    def candidatos(self, country_code, firma):
+        """
+        Patrones a probar para una dirección con esa firma: primero los de la
+        misma firma y después los que no tienen firma, de más a menos aciertos.
+        Devuelve una lista de (regex_compilada, grupos, entrada).
+        """
+        with self._lock:
+            por_firma = self._indexar(country_code)
+            candidatos = list(por_firma.get(firma, []))
+            if firma is not None:
+                candidatos.extend(por_firma.get(None, []))
+            return candidatos
+
+    def registrar(self, country_code, pattern_data):
+        """
+        Añade un patrón a la biblioteca del país; devuelve False si ya existía.
+        Si el país ya tiene MAX_PATTERNS_PER_COUNTRY patrones, antes de añadirlo se
+        descarta el que menos acierta (entre empates, el más antiguo), de modo que
+        el patrón nuevo siempre se conserva.
+        """
+        with self._lock:
+            patrones = self._cargar().setdefault(country_code, {"patterns": []})["patterns"]
+            if any(p["pattern"] == pattern_data["pattern"] for p in patrones):
+                return False
+            entrada = dict(pattern_data)
+            entrada.setdefault("signature", None)
+            entrada.setdefault("hits", 0)
+            while len(patrones) >= MAX_PATTERNS_PER_COUNTRY:
+                # min devuelve el primero de los empatados: el más antiguo
+                patrones.remove(min(patrones, key=lambda p: p.get("hits", 0)))
+            patrones.append(entrada)
+            self._indice.pop(country_code, None)
+            self._marcar_pendiente()
+            return True
+
+    def sumar_aciertos(self, country_code, entrada, cantidad=1):
+        """Suma aciertos a un patrón y lo reordena entre los de su firma."""
+        if cantidad <= 0:
+            return
+        with self._lock:
+            entrada["hits"] = entrada.get("hits", 0) + cantidad
+            candidatos = self._indice.get(country_code, {}).get(entrada.get("signature"))
+            if candidatos:
+                candidatos.sort(key=lambda c: c[2].get("hits", 0), reverse=True)
+            # Los aciertos no cuentan como formato nuevo: se guardan por tiempo o al salir
+            self._sucio = True
+            if time.monotonic() - self._ultimo_guardado >= self.flush_interval:
+                self.guardar()
+
+    def reemplazar(self, formatos):
+        """Sustituye todos los formatos (compatibilidad con guardar_formatos)."""
+        with self._lock:
+            self._formatos = {pais: self._convertir(entrada) for pais, entrada in formatos.items()}
+            self._indice = {}
+            self._marcar_pendiente()
+
+    def _marcar_pendiente(self):
+        self._pendientes += 1
+        self._sucio = True
+        if (self._pendientes >= self.flush_every
+                or time.monotonic() - self._ultimo_guardado >= self.flush_interval):
+            self.guardar()
+
+    def guardar(self):
+        """Escribe en disco los cambios pendientes de forma atómica."""
+        with self._lock:
+            if not self._sucio or self._formatos is None:
+                return
+            carpeta = os.path.dirname(os.path.abspath(self.ruta))
+            fd, tmp_path = tempfile.mkstemp(prefix=".formatos-", suffix=".tmp", dir=carpeta)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self._formatos, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.ruta)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._pendientes = 0
+            self._sucio = False
+            self._ultimo_guardado = time.monotonic()
+
+
+# Registro compartido por todo el proceso
+REGISTRO_FORMATOS = RegistroFormatos()
 
 
 # Cargar patrones aprendidos desde JSON
 def cargar_formatos():
-    if os.path.exists(FORMATOS_FILE):
-        with open(FORMATOS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    return REGISTRO_FORMATOS.formatos()
 
 
 # Guardar patrones aprendidos en JSON
 def guardar_formatos(formatos):
-    with open(FORMATOS_FILE, "w", encoding="utf-8") as f:
-        json.dump(formatos, f, indent=4, ensure_ascii=False)
+    REGISTRO_FORMATOS.reemplazar(formatos)
+    REGISTRO_FORMATOS.guardar()
 
 
-# Consultar OpenStreetMap (OSM) si el patrón no es conocido
+# Consultar OpenStreetMap (OSM) si el patrón no es conocido.
+# Pasa por el geocodificador compartido: caché persistente, deduplicación
+# de direcciones repetidas y como máximo 1 petición por segundo a Nominatim.
 def query_osm_nominatim(address):
-    try:
-        params = {
-            "q": address,
-            "format": "json",
-            "addressdetails": 1,
-            "limit": 1,
-        }
-        response = requests.get(NOMINATIM_URL, params=params, headers={"User-Agent": "CentralCompanies/1.0"})
-        response.raise_for_status()
-        data = response.json()
-
-        if not data:
-            return None, None, None, None, None
-
-        address_data = data[0]["address"]
-        street = address_data.get("road", "")
-        postal_code = address_data.get("postcode", "")
-        locality = address_data.get("city", address_data.get("town", address_data.get("village", "")))
-        province = address_data.get("state", "")
-        country = address_data.get("country_code", "").upper()
-
-        return street, postal_code, locality, province, country
-
-    except requests.RequestException as e:
-        print(f"Error en OpenStreetMap: {e}")
-        return None, None, None, None, None
+    return obtener_geocodificador().geocodificar(address)
 
 
 # Intentar normalizar con un patrón conocido
 def parse_address_with_pattern(address, pattern_data):
-    match = re.match(pattern_data["pattern"], address.strip())
+    """
+    'pattern_data' puede ser el dict del JSON ({"pattern", "groups"})
+    o la tupla (regex_compilada, grupos) del registro.
+    """
+    if isinstance(pattern_data, dict):
+        regex, grupos = re.compile(pattern_data["pattern"]), pattern_data["groups"]
+    else:
+        regex, grupos = pattern_data[0], pattern_data[1]
+    match = regex.match(address.strip())
     if match:
         values = match.groups()
-        parsed_data = {key: values[i] for i, key in enumerate(pattern_data["groups"])}
+        if len(values) != len(grupos):
+            return None
+        parsed_data = {key: (values[i] or "").strip() for i, key in enumerate(grupos)}
         return parsed_data
     return None
 
 
+# Regex general de un código postal: "11380" -> \d{5}, "1000-001" -> \d{4}\-\d{3}
+def generalizar_codigo_postal(postal_code):
+    partes = []
+    for caracter in postal_code:
+        if caracter.isdigit():
+            clase = r"\d"
+        elif caracter.isalpha():
+            clase = "[A-Za-z]"
+        elif caracter.isspace():
+            clase = r"\s?"
+        else:
+            clase = re.escape(caracter)
+        if partes and partes[-1][0] == clase and clase != r"\s?":
+            partes[-1][1] += 1
+        else:
+            partes.append([clase, 1])
+    return "".join(clase if n == 1 else f"{clase}{{{n}}}" for clase, n in partes)
+
+
+# Patrón general con la estructura de una dirección cuyo código postal conocemos
+def generalizar_patron(address, postal_code):
+    """
+    Sustituye cada parte de la dirección por un grupo genérico y conserva su
+    estructura (segmentos y posición del código postal). Por ejemplo:
+      "Calle Trafalgar, 11380 Tarifa, Andalucía" ->
+      (?P<street>[^,]+?)\\s*,\\s*(?P<postal_code>\\d{5})\\s+(?P<locality>[^,]+?)\\s*,\\s*(?P<province>[^,]+?)\\s*$
+    Devuelve {"pattern", "groups", "signature"} o None si el código postal
+    no aparece en la dirección o no queda ninguna parte para la calle.
+    """
+    address = address.strip()
+    postal_code = (postal_code or "").strip()
+    if not postal_code:
+        return None
+
+    segmentos = [s.strip() for s in address.split(",")]
+    indice_cp = posicion = None
+    for indice in range(len(segmentos) - 1, -1, -1):
+        posicion = segmentos[indice].upper().rfind(postal_code.upper())
+        if posicion >= 0:
+            indice_cp = indice
+            break
+    if indice_cp is None:
+        return None
+
+    antes = segmentos[indice_cp][:posicion].strip()
+    despues = segmentos[indice_cp][posicion + len(postal_code):].strip()
+    grupos = []
+    partes = []
+
+    # Segmentos anteriores al del código postal: la calle (con número, piso...)
+    if indice_cp > 0:
+        partes.append(r"(?P<street>[^,]+?" + r"(?:\s*,\s*[^,]+?)" * (indice_cp - 1) + ")")
+        grupos.append("street")
+
+    # Segmento del código postal: "CP Localidad", "Localidad CP", "Calle CP" o solo "CP"
+    pieza = ""
+    if antes:
+        campo = "locality" if grupos else "street"
+        pieza += rf"(?P<{campo}>[^,]+?)\s+"
+        grupos.append(campo)
+    pieza += f"(?P<postal_code>{generalizar_codigo_postal(postal_code)})"
+    grupos.append("postal_code")
+    if despues:
+        if "locality" in grupos:
+            pieza += r"\s+[^,]+?"
+        else:
+            pieza += r"\s+(?P<locality>[^,]+?)"
+            grupos.append("locality")
+    partes.append(pieza)
+
+    # Segmentos posteriores: localidad (si falta), provincia y el resto sin capturar
+    for _ in segmentos[indice_cp + 1:]:
+        if "locality" not in grupos:
+            partes.append(r"(?P<locality>[^,]+?)")
+            grupos.append("locality")
+        elif "province" not in grupos:
+            partes.append(r"(?P<province>[^,]+?)")
+            grupos.append("province")
+        else:
+            partes.append(r"[^,]+?")
+
+    if "street" not in grupos:
+        return None
+
+    return {
+        "pattern": r"\s*,\s*".join(partes) + r"\s*$",
+        "groups": grupos,
+        "signature": firma_direccion(address),
+    }
+
+
 # Aprender un nuevo patrón a partir de los datos de OpenStreetMap
-def aprender_nuevo_formato(address, country_code, osm_data, formatos):
+def aprender_nuevo_formato(address, country_code, osm_data, formatos=None):
     street, postal_code, locality, province, country = osm_data
-    if not all([street, postal_code, locality, province]):
-        return False  # No hay suficientes datos para crear un patrón
+    if not postal_code:
+        return False  # Sin código postal no se puede ubicar la estructura de la dirección
 
-    # Crear un nuevo patrón basado en la estructura de la dirección
-    new_pattern = re.escape(street) + r",?\s*" + re.escape(postal_code) + r"\s+" + re.escape(
-        locality) + r",\s*" + re.escape(province)
+    # Crear un patrón general basado en la estructura de la dirección, no en sus valores
+    pattern_data = generalizar_patron(address, postal_code)
+    if pattern_data is None:
+        return False
 
-    formatos[country_code] = {
-        "pattern": new_pattern,
-        "groups": ["street", "postal_code", "locality", "province"]
-    }
-    guardar_formatos(formatos)
-    print(f"Nuevo formato aprendido para {country_code}: {new_pattern}")
+    if formatos is not None:
+        formatos.setdefault(country_code, {"patterns": []})["patterns"].append(pattern_data)
+    if REGISTRO_FORMATOS.registrar(country_code, pattern_data):
+        print(f"Nuevo formato aprendido para {country_code}: {pattern_data['pattern']}")
     return True
 
 
+# Probar los patrones candidatos de la biblioteca sobre una dirección
+def parse_address_with_library(address, country_code):
+    """Devuelve (street, postal_code, locality, province, country) o None si ningún patrón encaja."""
+    if not isinstance(address, str):
+        return None
+    for regex, grupos, entrada in REGISTRO_FORMATOS.candidatos(country_code, firma_direccion(address)):
+        parsed_data = parse_address_with_pattern(address, (regex, grupos))
+        if parsed_data:
+            REGISTRO_FORMATOS.sumar_aciertos(country_code, entrada)
+            return (parsed_data.get("street", ""), parsed_data.get("postal_code", ""),
+                    parsed_data.get("locality", ""), parsed_data.get("province", ""), country_code)
+    return None
+
+
 # Función principal que intenta normalizar una dirección con patrones aprendidos o OSM
 def parse_address_by_country(address, country_code):
-    formatos = cargar_formatos()
     country_code = country_code.upper()
 
-    # Intentar usar un patrón aprendido previamente
-    if country_code in formatos:
-        parsed_data = parse_address_with_pattern(address, formatos[country_code])
-        if parsed_data:
-            return parsed_data["street"], parsed_data["postal_code"], parsed_data["locality"], parsed_data[
-                "province"], country_code
+    # Intentar usar los patrones aprendidos (ya compilados en el registro)
+    parsed = parse_address_with_library(address, country_code)
+    if parsed:
+        return parsed
 
     # Si no hay patrón, consultar OpenStreetMap
     print(f"Consultando OpenStreetMap para mejorar la dirección: {address}")
@@ -100,10 +398,69 @@ def parse_address_by_country(address, country_code):
 
     if osm_data and any(osm_data):
         # Intentar aprender el nuevo formato
-        if aprender_nuevo_formato(address, country_code, osm_data, formatos):
+        if aprender_nuevo_formato(address, country_code, osm_data):
             return osm_data
         else:
             return osm_data  # Devolver datos sin aprendizaje
 
     # Si no se encontró nada, devolver la dirección sin procesar
     return address, "", "", "", country_code
+
+
+# Versión por columnas: normaliza todas las direcciones de un país de una vez
+def normalizar_direcciones_df(direcciones, country_code):
+    """
+    Normaliza una columna completa de direcciones.
+
+    1. Agrupa las direcciones por firma y aplica a cada grupo sus patrones
+       candidatos (de más a menos aciertos) con Series.str.extract, en bloque.
+    2. Solo las direcciones que no encajan pasan por parse_address_by_country
+       (geocodificación y aprendizaje), una vez por dirección distinta.
+
+    Devuelve un DataFrame con las columnas ADDRESS_COLUMNS y el mismo índice.
+    Las celdas vacías conservan la dirección original en 'street'.
+    """
+    country_code = country_code.upper()
+    resultado = pd.DataFrame("", index=direcciones.index, columns=ADDRESS_COLUMNS, dtype=object)
+    resultado["street"] = direcciones
+    resultado["country"] = country_code
+
+    es_texto = direcciones.map(lambda x: isinstance(x, str))
+    textos = direcciones[es_texto].str.strip()
+    encajadas = pd.Series(False, index=textos.index)
+
+    firmas = textos.map(firma_direccion)
+    for firma, filas in firmas.groupby(firmas).groups.items():
+        restantes = textos.loc[filas]
+        for regex, grupos, entrada in REGISTRO_FORMATOS.candidatos(country_code, firma):
+            if restantes.empty:
+                break
+            # str.extract busca en cualquier posición: se ancla al inicio como re.match
+            extraido = restantes.str.extract("^(?:" + regex.pattern + ")", flags=regex.flags, expand=True)
+            extraido.columns = grupos
+            encaja = extraido.notna().any(axis=1)
+            if not encaja.any():
+                continue
+            indices = encaja[encaja].index
+            for columna in ADDRESS_COLUMNS[:4]:
+                if columna in extraido.columns:
+                    resultado.loc[indices, columna] = extraido.loc[indices, columna].fillna("").str.strip()
+                else:
+                    resultado.loc[indices, columna] = ""
+            encajadas.loc[indices] = True
+            REGISTRO_FORMATOS.sumar_aciertos(country_code, entrada, len(indices))
+            restantes = restantes[~encaja]
+
+    # Camino lento solo para las filas que no encajan, una vez por dirección distinta
+    pendientes = encajadas[~encajadas].index
+    if len(pendientes):
+        por_direccion = {
+            direccion: parse_address_by_country(direccion, country_code)
+            for direccion in direcciones.loc[pendientes].unique()
+        }
+        filas = [por_direccion[direccion] for direccion in direcciones.loc[pendientes]]
+        resultado.loc[pendientes, ADDRESS_COLUMNS] = pd.DataFrame(
+            filas, index=pendientes, columns=ADDRESS_COLUMNS
+        ).astype(object)
+
+    return resultado
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+import threading
+import time
+from collections import deque
+from colorama import Fore
+
+# Valores por defecto del controlador
+AIMD_WINDOW_MIN = 10          # respuestas mínimas por ventana antes de decidir
+AIMD_ERROR_THRESHOLD = 0.10   # proporción de errores que provoca una reducción
+AIMD_LATENCY_TOLERANCE = 2.0  # reducción si la mediana supera esta proporción de la de referencia
+AIMD_DECREASE_FACTOR = 0.7    # reducción multiplicativa del límite
+AIMD_INCREASE_STEP = 1        # aumento aditivo del límite
+AIMD_BASELINE_DRIFT = 1.01    # la latencia de referencia puede subir un 1 % por ventana
+AIMD_MAX_DECISIONS = 200      # decisiones que se conservan en el historial
+
+
+def _fallo_cliente(resultado):
+    """
+    es_error por defecto: solo cuentan los fallos de la llamada (transporte, HTTP,
+    timeout), marcados con "fallo_cliente" (ver call_api_php), no las respuestas
+    de la API con "error" para un dominio concreto (web caída, dominio inexistente...).
+    """
+    return isinstance(resultado, dict) and bool(resultado.get("fallo_cliente"))
+
+
+def _mediana(valores):
+    ordenados = sorted(valores)
+    mitad = len(ordenados) // 2
+    if len(ordenados) % 2:
+        return ordenados[mitad]
+    return (ordenados[mitad - 1] + ordenados[mitad]) / 2
+
+
+class ControladorConcurrencia:
+    """
+    Limita las llamadas simultáneas a un servicio y ajusta ese límite solo
+    (AIMD: aumento aditivo, reducción multiplicativa):
+
+      - Cada ventana de respuestas (al menos AIMD_WINDOW_MIN, o el límite actual)
+        se calcula la proporción de errores y la mediana de latencia.
+      - Si hay demasiados errores, o la latencia se dispara respecto a la de
+        referencia (la mejor mediana vista), el límite se multiplica por
+        AIMD_DECREASE_FACTOR.
+      - Si todo va bien y el límite se ha llegado a usar entero, sube en
+        AIMD_INCREASE_STEP.
+      - El límite siempre queda entre 'minimo' y 'maximo'.
+
+    Uso:
+        controlador.ejecutar(funcion, *args)  # espera turno, llama y registra el resultado
+    Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, inicial=10, minimo=1, maximo=50, nombre="API",
+                 ventana_min=AIMD_WINDOW_MIN, umbral_errores=AIMD_ERROR_THRESHOLD,
+                 tolerancia_latencia=AIMD_LATENCY_TOLERANCE, factor_reduccion=AIMD_DECREASE_FACTOR,
+                 paso_aumento=AIMD_INCREASE_STEP, es_error=None):
+        if not minimo <= inicial <= maximo:
+            raise ValueError(f"Límite inicial {inicial} fuera de [{minimo}, {maximo}]")
+        self.nombre = nombre
+        self.minimo = minimo
+        self.maximo = maximo
+        self.ventana_min = ventana_min
+        self.umbral_errores = umbral_errores
+        self.tolerancia_latencia = tolerancia_latencia
+        self.factor_reduccion = factor_reduccion
+        self.paso_aumento = paso_aumento
+        self.es_error = es_error or _fallo_cliente
+
+        self._condicion = threading.Condition()
+        self._limite = inicial
+        self._en_vuelo = 0
+        self._max_en_vuelo = 0          # máximo de llamadas simultáneas en la ventana actual
+        self._respuestas = 0
+        self._latencias = []            # latencias de las llamadas correctas de la ventana
+        self._errores = 0
+        self._referencia = None         # mejor mediana de latencia observada
+        self.decisiones = deque(maxlen=AIMD_MAX_DECISIONS)
+        self.llamadas = 0
+        self.errores_totales = 0
+
+    @property
+    def limite(self):
+        with self._condicion:
+            return self._limite
+
+    # ---------------------------------------------------------
+    # Control de acceso
+    # ---------------------------------------------------------
+    def adquirir(self):
+        """Espera hasta que haya hueco dentro del límite actual."""
+        with self._condicion:
+            while self._en_vuelo >= self._limite:
+                self._condicion.wait()
+            self._en_vuelo += 1
+            self._max_en_vuelo = max(self._max_en_vuelo, self._en_vuelo)
+
+    def liberar(self, latencia, error):
+        """Registra el resultado de una llamada y libera su hueco."""
+        with self._condicion:
+            self._en_vuelo -= 1
+            self.llamadas += 1
+            self._respuestas += 1
+            if error:
+                self._errores += 1
+                self.errores_totales += 1
+            else:
+                self._latencias.append(latencia)
+            if self._respuestas >= max(self.ventana_min, self._limite):
+                self._decidir()
+            self._condicion.notify_all()
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        """Llama a 'funcion' respetando el límite y registra su latencia y si falló."""
+        self.adquirir()
+        inicio = time.monotonic()
+        error = True
+        try:
+            resultado = funcion(*args, **kwargs)
+            error = self.es_error(resultado)
+            return resultado
+        finally:
+            self.liberar(time.monotonic() - inicio, error)
+
+    # ---------------------------------------------------------
+    # Ajuste del límite
+    # ---------------------------------------------------------
+    def _decidir(self):
+        # Se llama con el lock tomado, al cerrar una ventana
+        proporcion_errores = self._errores / self._respuestas
+        mediana = _mediana(self._latencias) if self._latencias else None
+
+        if mediana is not None and proporcion_errores < self.umbral_errores:
+            if self._referencia is None:
+                self._referencia = mediana
+            else:
+                self._referencia = min(mediana, self._referencia * AIMD_BASELINE_DRIFT)
+
+        anterior = self._limite
+        if proporcion_errores >= self.umbral_errores:
+            motivo = f"errores {proporcion_errores:.0%}"
+            self._limite = max(self.minimo, int(self._limite * self.factor_reduccion))
+        elif (mediana is not None and self._referencia
+              and mediana > self._referencia * self.tolerancia_latencia):
+            motivo = f"latencia {mediana:.2f}s (referencia {self._referencia:.2f}s)"
+            self._limite = max(self.minimo, int(self._limite * self.factor_reduccion))
+        elif self._max_en_vuelo >= self._limite:
+            motivo = "sin errores y latencia estable"
+            self._limite = min(self.maximo, self._limite + self.paso_aumento)
+        else:
+            motivo = "límite sin usar entero"
+
+        if self._limite != anterior:
+            self.decisiones.append({
+                "instante": time.time(),
+                "anterior": anterior,
+                "limite": self._limite,
+                "motivo": motivo,
+                "latencia_mediana": mediana,
+                "errores": proporcion_errores,
+            })
+            color = Fore.CYAN if self._limite > anterior else Fore.RED
+            print(color + f"🎚 Concurrencia {self.nombre}: {anterior} -> {self._limite} ({motivo})")
+
+        self._respuestas = 0
+        self._latencias = []
+        self._errores = 0
+        self._max_en_vuelo = self._en_vuelo
+
+    def estadisticas(self):
+        """Estado actual del controlador y últimas decisiones."""
+        with self._condicion:
+            return {
+                "limit": self._limite,
+                "in_flight": self._en_vuelo,
+                "min": self.minimo,
+                "max": self.maximo,
+                "calls": self.llamadas,
+                "errors": self.errores_totales,
+                "baseline_latency": self._referencia,
+                "decisions": list(self.decisiones)[-10:],
+            }
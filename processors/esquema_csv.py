@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Esquema de lectura de los CSV de Google Maps.
+
+Solo se leen las columnas que se publican (COLUMN_ORDER de Publicador) más las
+que necesita el proceso, y cada una con un tipo compacto:
+  - texto: cadenas de Arrow ("string[pyarrow]") si pyarrow está instalado,
+  - columnas muy repetidas (sector, país...): 'category',
+  - indicadores True/False: 'category', con los literales true/false escritos
+    como "True"/"False" (ver aplicar_esquema),
+  - números: los que deduce pandas (no se reducen para no alterar los valores publicados).
+"""
+
+import pandas as pd
+from colorama import Fore
+from Publicador import COLUMN_ORDER
+from .parallel_api import SOCIAL_COLUMNS
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    TEXT_DTYPE = "string"
+
+# Columnas que rellena el enriquecimiento (emails + redes sociales)
+ENRICHMENT_COLUMNS = ["Emails"] + SOCIAL_COLUMNS
+
+# Columnas del CSV que se leen: las publicadas, las de entrada del proceso
+# ('place_id' se publica como 'id') y las del enriquecimiento si ya vienen
+INPUT_COLUMNS = set(COLUMN_ORDER) | {"place_id", "website", "address"} | set(ENRICHMENT_COLUMNS)
+
+# Columnas con pocos valores distintos
+CATEGORY_COLUMNS = ["main_category", "categories", "country", "closed_on"]
+# Indicadores True/False (se leen como categoría y se normalizan después, ver aplicar_esquema)
+BOOL_COLUMNS = ["is_spending_on_ads", "is_temporarily_closed", "can_claim"]
+# Columnas numéricas (tipo deducido por pandas)
+NUMERIC_COLUMNS = ["rating", "reviews"]
+
+_LITERALES_BOOL = {"true": "True", "false": "False"}
+
+
+def columna_necesaria(columna):
+    """usecols de read_csv: True si la columna se usa en el proceso o en la publicación."""
+    return columna in INPUT_COLUMNS
+
+
+def tipos_lectura():
+    """dtype de read_csv para las columnas de INPUT_COLUMNS."""
+    tipos = {}
+    for columna in INPUT_COLUMNS:
+        if columna in NUMERIC_COLUMNS:
+            continue
+        if columna in CATEGORY_COLUMNS or columna in BOOL_COLUMNS:
+            tipos[columna] = "category"
+        elif columna in ENRICHMENT_COLUMNS:
+            # El enriquecimiento escribe en ellas celda a celda
+            tipos[columna] = object
+        else:
+            tipos[columna] = TEXT_DTYPE
+    return tipos
+
+
+def aplicar_esquema(df):
+    """
+    Las columnas de BOOL_COLUMNS siguen siendo 'category' (el tipo lo fija el
+    esquema, no los valores de cada bloque); solo se reescriben los literales
+    true/false (sin distinguir mayúsculas) como "True"/"False", igual que los
+    publicaba pandas al leer sin esquema. El resto de valores (p. ej. 0/1) no cambia.
+    """
+    for columna in BOOL_COLUMNS:
+        if columna not in df.columns:
+            continue
+        serie = df[columna]
+        etiquetas = {c: _LITERALES_BOOL.get(str(c).strip().lower(), c) for c in serie.cat.categories}
+        if any(original != nueva for original, nueva in etiquetas.items()):
+            df[columna] = serie.map(etiquetas).astype("category")
+    return df
+
+
+def preparar_columnas_enriquecimiento(df):
+    """
+    Crea las ENRICHMENT_COLUMNS que falten, con dtype object: el enriquecimiento
+    escribe en ellas celda a celda y en una columna de cadenas de Arrow cada
+    escritura copiaría la columna entera.
+    """
+    for columna in ENRICHMENT_COLUMNS:
+        if columna not in df.columns:
+            df[columna] = pd.Series(pd.NA, index=df.index, dtype=object)
+    return df
+
+
+def leer_csv(file_path, chunk_size=None):
+    """
+    Lee un CSV de Google Maps con el esquema compacto.
+    Sin 'chunk_size' devuelve el DataFrame; con él, un iterador de bloques.
+    """
+    opciones = {"usecols": columna_necesaria, "dtype": tipos_lectura()}
+    if chunk_size:
+        return (aplicar_esquema(bloque) for bloque in pd.read_csv(file_path, chunksize=chunk_size, **opciones))
+    return aplicar_esquema(pd.read_csv(file_path, **opciones))
+
+
+def memoria_mb(df):
+    """Memoria ocupada por el DataFrame (incluido el contenido de las cadenas), en MB."""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def informar_memoria(df, file_path, detalle=""):
+    """Muestra la memoria que ocupa el DataFrame leído de 'file_path'."""
+    print(Fore.CYAN + f"🧮 {file_path}{detalle}: {len(df)} filas x {len(df.columns)} columnas, "
+                      f"{memoria_mb(df):.1f} MB en memoria.")
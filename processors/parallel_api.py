@@ -1,51 +1,354 @@
 #!/usr/bin/env python3
 import concurrent.futures
-from crawler_api_php import call_api_php
+import threading
+import time
+from colorama import Fore
+from cache_enriquecimiento import obtener_cache_enriquecimiento, dominio_canonico
+from crawler_api_php import call_api_php, call_api_php_batch, PHP_API_HOST
+from http_pool import ensure_pool_capacity
 from email_utils import filtrar_emails
+from configuracion import (API_MIN_WORKERS, API_INITIAL_WORKERS, API_MAX_WORKERS,
+                           API_BATCH_MODE, API_BATCH_SIZE)
+from .concurrencia_adaptativa import ControladorConcurrencia
 
+# Columnas de redes sociales que se rellenan con la respuesta de la API
+SOCIAL_COLUMNS = ["Instagram", "Facebook", "YouTube", "LinkedIn", "Twitter", "TikTok", "Pinterest"]
 
-def process_single_website(args):
+# Plazo máximo por sitio, desde que empieza su llamada (segundos)
+API_TASK_TIMEOUT = 60
+# Plazo máximo por lote de dominios en modo lote, desde que sale la petición (segundos)
+API_BATCH_TASK_TIMEOUT = 180
+# Plazo máximo para un lote completo (segundos; None = sin límite)
+API_BATCH_TIMEOUT = None
+# Cada cuánto se revisan los plazos mientras se esperan resultados (segundos)
+API_POLL_INTERVAL = 1.0
+
+# Controlador adaptativo de las llamadas simultáneas a la API, compartido por todo el proceso
+CONTROLADOR_API = ControladorConcurrencia(
+    inicial=API_INITIAL_WORKERS, minimo=API_MIN_WORKERS, maximo=API_MAX_WORKERS, nombre="API"
+)
+# Las peticiones de lote son mucho más lentas que las individuales: llevan su propio
+# controlador para no mezclar sus latencias. Un lote cuenta como error si la petición
+# entera falla (todos sus dominios llevan "fallo_cliente", ver consultar_lote).
+CONTROLADOR_API_LOTES = ControladorConcurrencia(
+    inicial=API_INITIAL_WORKERS, minimo=API_MIN_WORKERS, maximo=API_MAX_WORKERS, nombre="API lotes",
+    es_error=lambda resultados: all(respuesta.get("fallo_cliente") for respuesta in resultados.values())
+)
+
+# Pool de hilos compartido por todos los archivos que se procesan a la vez:
+# fija el máximo global de llamadas simultáneas a la API (ver configurar_presupuesto_api)
+_EXECUTOR_COMPARTIDO = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def configurar_presupuesto_api(max_workers):
     """
-    Llama a la API PHP para un sitio web y filtra los emails retornados,
-    además de extraer redes sociales.
+    Crea el pool compartido de llamadas a la API con 'max_workers' hilos.
+    Desde ese momento todas las llamadas a run_parallel_api, vengan del archivo
+    que vengan, se reparten ese mismo presupuesto.
+    """
+    global _EXECUTOR_COMPARTIDO
+    with _EXECUTOR_LOCK:
+        anterior = _EXECUTOR_COMPARTIDO
+        _EXECUTOR_COMPARTIDO = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="api"
+        )
+    if anterior is not None:
+        anterior.shutdown(wait=True)
+    # Una conexión keep-alive por hilo contra la API, reutilizada entre llamadas
+    ensure_pool_capacity(max_workers, host=PHP_API_HOST)
 
-    Args:
-        args (tuple): (index, website, exclusiones)
 
-    Returns:
-        tuple: (index, emails_filtrados, social_data)
+def cerrar_presupuesto_api():
+    """Cierra el pool compartido; run_parallel_api vuelve a usar un pool propio por llamada."""
+    global _EXECUTOR_COMPARTIDO
+    with _EXECUTOR_LOCK:
+        anterior, _EXECUTOR_COMPARTIDO = _EXECUTOR_COMPARTIDO, None
+    if anterior is not None:
+        anterior.shutdown(wait=True)
+
+
+def llamar_api(website, al_empezar=None, plazo=None):
     """
-    index, website, exclusiones = args
-    api_response = call_api_php(website)
+    call_api_php pasando por el controlador adaptativo de concurrencia.
+    'al_empezar' se llama cuando la petición obtiene turno y sale de verdad; desde
+    ese momento cuentan los 'plazo' segundos que tiene la llamada (reintentos y
+    espera al circuit breaker incluidos).
+    """
+    def llamada():
+        limite = time.monotonic() + plazo if plazo else None
+        if al_empezar is not None:
+            al_empezar()
+        return call_api_php(website, limite)
+    return CONTROLADOR_API.ejecutar(llamada)
+
+
+def formatear_respuesta(api_response, exclusiones):
+    """
+    Filtra los emails de una respuesta de la API (exclusiones y formato; la
+    validación DNS se hace después en lote) y une las redes sociales por columna.
 
+    Returns:
+        tuple: (emails_filtrados, social_data)
+    """
     emails = api_response.get("emails", [])
-    emails_filtrados = filtrar_emails(emails, exclusiones)
+    emails_filtrados = filtrar_emails(emails, exclusiones, validar_dns=False)
 
-    social_columns = ["Instagram", "Facebook", "YouTube", "LinkedIn", "Twitter", "TikTok", "Pinterest"]
     social_data = {
         col: ", ".join(api_response.get("social_links", {}).get(col, []))
-        for col in social_columns
+        for col in SOCIAL_COLUMNS
     }
+    return emails_filtrados, social_data
+
+
+def process_single_website(args, al_empezar=None, plazo=None):
+    """
+    Llama a la API PHP para un sitio web y filtra los emails retornados
+    (exclusiones y formato; la validación DNS se hace después en lote),
+    además de extraer redes sociales.
+    La respuesta de la API se toma de la caché de enriquecimiento si el
+    dominio se consultó hace poco (en esta u otra ejecución).
+
+    Args:
+        args (tuple): (index, website, exclusiones)
+        al_empezar (callable): Opcional; se llama cuando sale la petición a la API
+        plazo (float): Opcional; segundos máximos de la llamada desde que sale
 
+    Returns:
+        tuple: (index, emails_filtrados, social_data), o (index, None, None) si la
+               API no llegó a responder (timeout, HTTP 5xx, circuito abierto...)
+    """
+    index, website, exclusiones = args
+    api_response = obtener_cache_enriquecimiento().obtener(
+        website, lambda web: llamar_api(web, al_empezar, plazo)
+    )
+    if api_response.get("fallo_cliente"):
+        return index, None, None
+    emails_filtrados, social_data = formatear_respuesta(api_response, exclusiones)
     return index, emails_filtrados, social_data
 
 
-def run_parallel_api(valid_websites, exclusiones, max_workers=10):
+def process_batch_websites(lote, exclusiones, al_empezar=None, plazo=None):
     """
-    Ejecuta en paralelo el proceso de llamadas a la API para un conjunto de sitios web.
+    Versión por lotes de process_single_website: consulta varios sitios con una
+    sola petición al endpoint de lotes de la API.
+
+      - Los sitios con respuesta vigente en la caché no se envían.
+      - Cada sitio recibe su propia respuesta; si el servidor devuelve error para
+        uno, ese sitio queda sin datos como en el modo individual.
+      - Si el lote falla entero o el servidor omite algún sitio, esos sitios no se
+        resuelven aquí: se devuelven aparte para que el llamador los envíe como
+        peticiones individuales, cada una con su plazo (ver iter_parallel_api).
+
+    Args:
+        lote (list): Lista de tuplas (clave, website)
+        exclusiones (set): Palabras clave para filtrar correos
+        al_empezar (callable): Opcional; se llama cuando sale la petición de lote
+        plazo (float): Opcional; segundos máximos de la petición de lote desde que sale
+
+    Returns:
+        tuple: (resultados, repetir)
+            - resultados: lista de tuplas (clave, emails_filtrados, social_data);
+              (clave, None, None) para los sitios sin respuesta de la API
+            - repetir: lista de tuplas (clave, website) que hay que consultar por separado
+    """
+    cache = obtener_cache_enriquecimiento()
+    respuestas = {}
+    sin_cache = []
+    for clave, website in lote:
+        respuesta = cache.buscar(website)
+        if respuesta is not None:
+            respuestas[clave] = respuesta
+        else:
+            sin_cache.append((clave, website))
+
+    if sin_cache:
+        def llamada():
+            limite = time.monotonic() + plazo if plazo else None
+            if al_empezar is not None:
+                al_empezar()
+            return call_api_php_batch([website for _, website in sin_cache], limite)
+
+        resultados = CONTROLADOR_API_LOTES.ejecutar(llamada)
+        for clave, website in sin_cache:
+            respuesta = resultados.get(website) or {"error": True, "lote_fallido": True}
+            if respuesta.get("lote_fallido"):
+                continue
+            cache.almacenar(website, respuesta)
+            respuestas[clave] = respuesta
+
+    repetir = [(clave, website) for clave, website in lote if clave not in respuestas]
+    resultados = [
+        (clave, None, None) if respuestas[clave].get("fallo_cliente")
+        else (clave, *formatear_respuesta(respuestas[clave], exclusiones))
+        for clave, _ in lote if clave in respuestas
+    ]
+    return resultados, repetir
+
+
+def iter_parallel_api(valid_websites, exclusiones, max_workers=API_MAX_WORKERS, al_completar=None,
+                      task_timeout=None, batch_timeout=API_BATCH_TIMEOUT, modo_lote=API_BATCH_MODE):
+    """
+    Versión en streaming de run_parallel_api: genera (index, emails_filtrados, social_data)
+    a medida que terminan las llamadas, en orden de finalización.
 
     Args:
         valid_websites (list): Lista de tuplas (index, website)
         exclusiones (set): Palabras clave para filtrar correos
         max_workers (int): Máximo número de hilos en el ThreadPool
+            (se ignora si hay un pool compartido, ver configurar_presupuesto_api).
+            Las llamadas simultáneas reales las limita CONTROLADOR_API.
+        al_completar (callable): Opcional; se llama con (index, emails_filtrados, social_data)
+            por cada fila terminada a tiempo (p. ej. para anotarla en el diario de progreso)
+        task_timeout (float): Segundos máximos por petición, contados desde que sale
+            (por defecto API_TASK_TIMEOUT, o API_BATCH_TASK_TIMEOUT en modo lote).
+            Se pasa también al cliente de la API, que deja de esperar al circuit
+            breaker y de reintentar al llegar a él y libera el hilo y el turno.
+        batch_timeout (float): Segundos máximos para todo el lote (None = sin límite)
+        modo_lote (bool): Si es True, envía API_BATCH_SIZE dominios por petición
+            al endpoint de lotes (ver process_batch_websites)
 
-    Returns:
-        list: Lista de tuplas (index, emails_filtrados, social_data)
+    Yields:
+        tuple: (index, emails_filtrados, social_data). Las filas que superan alguno de los
+               plazos, o cuya llamada falla (la API no responde: timeout, HTTP 5xx,
+               circuito abierto...), se generan como (index, None, None) y no se pasan
+               a 'al_completar', de modo que se reintentan al reanudar; su resultado
+               tardío se descarta. Las respuestas de la API con error para un dominio
+               (p. ej. "no existe") sí cuentan como terminadas.
+
+    Las filas que comparten dominio se consultan una sola vez y el resultado
+    se reparte entre todas ellas.
+    """
+    if task_timeout is None:
+        task_timeout = API_BATCH_TASK_TIMEOUT if modo_lote else API_TASK_TIMEOUT
+
+    # Deduplicar por dominio canónico antes de repartir el trabajo
+    filas_por_dominio = {}
+    tasks = []
+    for idx, web in valid_websites:
+        dominio = dominio_canonico(web) or web
+        if dominio in filas_por_dominio:
+            filas_por_dominio[dominio].append(idx)
+        else:
+            filas_por_dominio[dominio] = [idx]
+            tasks.append((dominio, web))
+    if len(tasks) < len(valid_websites):
+        print(Fore.CYAN + f"🔁 {len(valid_websites) - len(tasks)} filas comparten dominio con otra fila del lote.")
+
+    # Cada petición lleva un solo dominio, o API_BATCH_SIZE en modo lote
+    tamano = API_BATCH_SIZE if modo_lote else 1
+    lotes = [tasks[i:i + tamano] for i in range(0, len(tasks), tamano)]
+    if modo_lote and lotes:
+        print(Fore.CYAN + f"📦 {len(tasks)} dominios en {len(lotes)} peticiones de lote.")
+
+    # número de petición -> instante en que salió a la API. El plazo por petición cuenta
+    # desde ahí, no desde la espera de turno en el pool o en el controlador adaptativo.
+    inicios = {}
+    # Peticiones individuales con los sitios que un lote no resolvió (fallo del lote
+    # entero o sitio ausente en la respuesta): se envían al pool como tareas aparte
+    individuales = set()
+    plazo_individual = min(task_timeout, API_TASK_TIMEOUT) if modo_lote else task_timeout
+
+    def plazo(numero):
+        return plazo_individual if numero in individuales else task_timeout
+
+    def tarea(numero):
+        al_empezar = lambda: inicios.__setitem__(numero, time.monotonic())
+        if modo_lote and numero not in individuales:
+            return process_batch_websites(lotes[numero], exclusiones, al_empezar, task_timeout)
+        dominio, web = lotes[numero][0]
+        return [process_single_website((dominio, web, exclusiones), al_empezar, plazo(numero))], []
+
+    executor = propio = _EXECUTOR_COMPARTIDO
+    if executor is None:
+        # Una conexión keep-alive por hilo contra la API, reutilizada entre llamadas
+        ensure_pool_capacity(max_workers, host=PHP_API_HOST)
+        executor = propio = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    else:
+        propio = None
+
+    limite_lote = time.monotonic() + batch_timeout if batch_timeout else None
+    pendientes = {executor.submit(tarea, numero): numero for numero in range(len(lotes))}
+    vencidas = 0
+    fallidas = 0
+    try:
+        while pendientes:
+            # Esperar hasta que termine alguna llamada o venza el plazo más próximo
+            ahora = time.monotonic()
+            plazos = [inicios[n] + plazo(n) for n in pendientes.values() if n in inicios]
+            if limite_lote is not None:
+                plazos.append(limite_lote)
+            espera = min(min(plazos, default=ahora + API_POLL_INTERVAL) - ahora, API_POLL_INTERVAL)
+            done, _ = concurrent.futures.wait(pendientes, timeout=max(espera, 0.01),
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done:
+                numero = pendientes.pop(future)
+                try:
+                    resultados, repetir = future.result()
+                except Exception as e:
+                    nombres = ", ".join(dominio for dominio, _ in lotes[numero])
+                    print(Fore.RED + f"❌ Error procesando {nombres}: {e}")
+                    resultados, repetir = [(dominio, None, None) for dominio, _ in lotes[numero]], []
+                if repetir:
+                    print(Fore.YELLOW + f"🔂 {len(repetir)} dominios del lote se consultan por separado.")
+                for sitio in repetir:
+                    individuales.add(len(lotes))
+                    lotes.append([sitio])
+                    pendientes[executor.submit(tarea, len(lotes) - 1)] = len(lotes) - 1
+                for dominio, emails_filtrados, social_data in resultados:
+                    if emails_filtrados is None:
+                        fallidas += len(filas_por_dominio[dominio])
+                    for idx in filas_por_dominio[dominio]:
+                        if emails_filtrados is not None and al_completar is not None:
+                            al_completar(idx, emails_filtrados, social_data)
+                        yield idx, emails_filtrados, social_data
+
+            # Plazos vencidos: las filas se dan por agotadas y no se espera más por ellas
+            ahora = time.monotonic()
+            lote_vencido = limite_lote is not None and ahora >= limite_lote
+            for future, numero in list(pendientes.items()):
+                if lote_vencido or (numero in inicios and ahora - inicios[numero] >= plazo(numero)):
+                    del pendientes[future]
+                    future.cancel()
+                    for dominio, _ in lotes[numero]:
+                        vencidas += len(filas_por_dominio[dominio])
+                        for idx in filas_por_dominio[dominio]:
+                            yield idx, None, None
+    finally:
+        for future in pendientes:
+            future.cancel()
+        if propio is not None:
+            propio.shutdown(wait=False, cancel_futures=True)
+
+    if vencidas:
+        print(Fore.RED + f"⏱ {vencidas} filas superaron el tiempo máximo de la API y quedan pendientes.")
+    if fallidas:
+        print(Fore.RED + f"❌ {fallidas} filas sin respuesta de la API; quedan pendientes para la próxima ejecución.")
+    stats = obtener_cache_enriquecimiento().estadisticas()
+    print(Fore.CYAN + f"💾 Caché de enriquecimiento: {stats['hits']} aciertos, {stats['misses']} consultas a la API "
+                      f"({stats['hit_ratio']:.0%} de aciertos).")
+    print(Fore.CYAN + f"🎚 Límite actual de llamadas simultáneas a la API: {CONTROLADOR_API.limite}")
+
+
+def run_parallel_api(valid_websites, exclusiones, max_workers=API_MAX_WORKERS, al_completar=None):
     """
-    tasks = [(idx, web, exclusiones) for idx, web in valid_websites]
+    Ejecuta en paralelo el proceso de llamadas a la API para un conjunto de sitios web.
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Puedes generar la lista directamente con list(...) o en un bucle, ambas funcionan
-        results = list(executor.map(process_single_website, tasks))
+    Args:
+        valid_websites (list): Lista de tuplas (index, website)
+        exclusiones (set): Palabras clave para filtrar correos
+        max_workers (int): Máximo número de hilos en el ThreadPool
+            (se ignora si hay un pool compartido, ver configurar_presupuesto_api)
+        al_completar (callable): Opcional; se llama con (index, emails_filtrados, social_data)
+            en cuanto termina cada sitio (p. ej. para anotarlo en el diario de progreso)
 
-    return results
+    Returns:
+        list: Lista de tuplas (index, emails_filtrados, social_data) de las filas
+              terminadas a tiempo (ver iter_parallel_api).
+    """
+    return [
+        resultado
+        for resultado in iter_parallel_api(valid_websites, exclusiones, max_workers, al_completar)
+        if resultado[1] is not None
+    ]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+import socket
+import concurrent.futures
+from urllib.parse import urlparse
+from colorama import Fore
+from crawler import clean_url
+
+# Tiempo máximo total para resolver todos los hosts de un archivo (segundos)
+DNS_PREFILTER_TIMEOUT = 30
+
+
+def extraer_host(website):
+    """
+    Devuelve el hostname (en minúsculas) de un website, o None si no es una URL válida.
+    """
+    url = clean_url(website)
+    if not url:
+        return None
+    host = urlparse(url).hostname
+    return host.lower() if host else None
+
+
+def host_resuelve(host):
+    """
+    Comprueba si el host tiene alguna dirección IP (A/AAAA) usando el resolver del sistema,
+    el mismo que usará después la conexión HTTP.
+    """
+    try:
+        return bool(socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP))
+    except (socket.gaierror, UnicodeError, OSError):
+        return False
+
+
+def prefiltrar_websites(valid_websites, max_workers=50, timeout=DNS_PREFILTER_TIMEOUT):
+    """
+    Resuelve en paralelo todos los hosts únicos de la lista y descarta los dominios muertos
+    antes de llamar a la API.
+
+    Los hosts que no terminan de resolverse dentro de 'timeout' se conservan
+    (ante la duda no se descarta la fila).
+
+    Args:
+        valid_websites (list): Lista de tuplas (index, website)
+        max_workers (int): Resoluciones DNS simultáneas
+        timeout (float): Tiempo máximo total en segundos
+
+    Returns:
+        tuple: (websites_vivos, websites_muertos), ambas listas de tuplas (index, website)
+    """
+    hosts_por_fila = {idx: extraer_host(web) for idx, web in valid_websites}
+    hosts_unicos = {host for host in hosts_por_fila.values() if host}
+
+    hosts_muertos = set()
+    if hosts_unicos:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        futures = {executor.submit(host_resuelve, host): host for host in hosts_unicos}
+        done, not_done = concurrent.futures.wait(futures, timeout=timeout)
+        for future in done:
+            if not future.result():
+                hosts_muertos.add(futures[future])
+        for future in not_done:
+            future.cancel()
+        # No esperamos a las resoluciones colgadas: terminan solas por el timeout del sistema
+        executor.shutdown(wait=False)
+
+    vivos = []
+    muertos = []
+    for idx, web in valid_websites:
+        host = hosts_por_fila[idx]
+        if host and host not in hosts_muertos:
+            vivos.append((idx, web))
+        else:
+            muertos.append((idx, web))
+
+    print(Fore.BLUE + f"🔎 Prefiltro DNS: {len(hosts_unicos)} hosts únicos, "
+                      f"{len(hosts_muertos)} muertos, {len(muertos)} filas descartadas.")
+    return vivos, muertos
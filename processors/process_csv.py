@@ -1,58 +1,197 @@
 #!/usr/bin/env python3
 import os
-import pandas as pd
 from colorama import Fore
 # Import relativo: parallel_api.py está en la misma carpeta 'processors'
-from .parallel_api import run_parallel_api
+from .parallel_api import iter_parallel_api
+from .esquema_csv import leer_csv, preparar_columnas_enriquecimiento, memoria_mb, informar_memoria
+from .prefiltro_dominios import prefiltrar_websites
+from .validacion_emails import validar_emails_dataframe
 # Import de 'Publicador.py' (ubicado en la raíz del proyecto, o en el PYTHONPATH)
-from Publicador import guardar_archivos_finales
+from Publicador import guardar_archivos_finales, PublicacionIncremental
+from progreso import clave_archivo
 
-def process_csv(file_path, exclusiones, demo_mode=False):
+# Registros que se procesan en modo demo
+DEMO_LIMIT = 20
+
+
+def extraer_websites(df):
+    """Lista de (índice, website) con los sitios web válidos (que no sean NaN ni cadenas vacías)."""
+    return [
+        (idx, site.strip())
+        for idx, site in df["website"].dropna().items()
+        if site.strip()
+    ]
+
+
+def actualizar_fila(df, index, emails_filtrados, social_data):
+    """Escribe en la fila 'index' los emails y redes sociales obtenidos."""
+    df.at[index, "Emails"] = ", ".join(emails_filtrados)
+    for col, links in social_data.items():
+        df.at[index, col] = links
+
+
+def enriquecer(df, valid_websites, exclusiones, diario=None, clave=None):
+    """
+    Enriquece 'df' in situ con emails y redes sociales:
+      - Reutiliza las filas que el diario de progreso ya tiene enriquecidas.
+      - Descarta los dominios que no resuelven en DNS (prefiltro en bloque).
+      - Llama a 'iter_parallel_api' para extraer correos y redes sociales en paralelo
+        y actualiza las columnas 'Emails' y redes sociales a medida que llegan los
+        resultados (cada fila terminada se anota en el diario; las que agotan el
+        plazo o no obtienen respuesta de la API quedan vacías y se reintentarán al reanudar).
+      - Valida por DNS, en lote y en paralelo, todos los emails obtenidos.
+    Devuelve la lista de resultados (index, emails, social_data).
+    """
+    preparar_columnas_enriquecimiento(df)
+    results = []
+    al_completar = None
+    if diario is not None:
+        hechas = diario.filas_hechas(clave)
+        results = [(idx, *hechas[idx]) for idx, _ in valid_websites if idx in hechas]
+        valid_websites = [(idx, web) for idx, web in valid_websites if idx not in hechas]
+        if results:
+            print(Fore.CYAN + f"⏩ {len(results)} filas recuperadas del diario de progreso.")
+
+        def al_completar(index, emails, social):
+            diario.registrar_fila(clave, index, emails, social)
+
+    # Actualizamos el DataFrame con los datos recuperados del diario
+    for index, emails_filtrados, social_data in results:
+        actualizar_fila(df, index, emails_filtrados, social_data)
+
+    if valid_websites:
+        # Quitamos los dominios muertos antes de gastar llamadas a la API
+        valid_websites, _ = prefiltrar_websites(valid_websites)
+
+        # Llamamos a la ejecución en paralelo y volcamos cada resultado según llega
+        for index, emails_filtrados, social_data in iter_parallel_api(valid_websites, exclusiones,
+                                                                        al_completar=al_completar):
+            if emails_filtrados is None:
+                continue  # plazo agotado o la API no respondió: la fila queda sin enriquecer
+            actualizar_fila(df, index, emails_filtrados, social_data)
+            results.append((index, emails_filtrados, social_data))
+
+    # Validación DNS de todos los emails (una consulta por dominio)
+    validar_emails_dataframe(df, indices=[index for index, _, _ in results])
+    return results
+
+
+def process_csv(file_path, exclusiones, demo_mode=False, chunk_size=None, diario=None):
     """
     Procesa un archivo CSV:
-      - Lee el CSV y verifica que exista la columna 'website'.
+      - Lee el CSV (solo las columnas necesarias y con tipos compactos, ver
+        processors/esquema_csv.py) y verifica que exista la columna 'website'.
       - Prepara una lista de sitios web válidos (limpia los vacíos).
       - Si está en modo demo, se queda con los primeros 20 registros.
-      - Llama a 'run_parallel_api' para extraer correos y redes sociales en paralelo.
-      - Actualiza las columnas 'Emails' y redes sociales en el DataFrame.
+      - Enriquece las filas con emails y redes sociales (ver 'enriquecer').
       - Finalmente, invoca 'guardar_archivos_finales' para guardar el DataFrame en la carpeta de salida.
+
+    Con 'chunk_size' el archivo se procesa por bloques (ver process_csv_por_bloques)
+    y la memoria no depende del tamaño del CSV.
+    Con 'diario' (DiarioProgreso) se saltan los archivos ya terminados y las filas
+    ya enriquecidas en una ejecución anterior.
     """
+    if chunk_size:
+        return process_csv_por_bloques(file_path, exclusiones, demo_mode, chunk_size, diario)
+
     base_name = os.path.basename(file_path).replace(".csv", "")
     print(Fore.YELLOW + f"📄 Procesando archivo: {file_path}")
 
     try:
-        df = pd.read_csv(file_path)
+        clave = clave_archivo(file_path)
+        if diario is not None and diario.archivo_completado(clave, demo_mode):
+            print(Fore.CYAN + f"⏩ {file_path} ya se publicó en la ejecución anterior. Saltando...")
+            return
+
+        df = leer_csv(file_path)
+        informar_memoria(df, file_path)
         if "website" not in df.columns:
             print(Fore.RED + f"⚠ Archivo sin 'website'. Saltando...")
             return
 
-        # Extraer los sitios web válidos (que no sean NaN ni cadenas vacías)
-        valid_websites = [
-            (idx, site.strip())
-            for idx, site in df["website"].dropna().items()
-            if site.strip()
-        ]
+        valid_websites = extraer_websites(df)
 
         if demo_mode:
             # Limitar a 20 registros si es modo demo
-            valid_websites = valid_websites[:20]
+            valid_websites = valid_websites[:DEMO_LIMIT]
             print(Fore.BLUE + f"🔹 Modo demo activado. Procesando {len(valid_websites)} registros.")
 
         if not valid_websites:
             print(Fore.RED + "🚨 No hay URLs válidas para procesar en este archivo.")
             return
 
-        # Llamamos a la ejecución en paralelo para obtener emails y redes sociales
-        results = run_parallel_api(valid_websites, exclusiones)
-
-        # Actualizamos el DataFrame con los datos recibidos
-        for index, emails_filtrados, social_data in results:
-            df.at[index, "Emails"] = ", ".join(emails_filtrados)
-            for col, links in social_data.items():
-                df.at[index, col] = links
+        enriquecer(df, valid_websites, exclusiones, diario, clave)
 
         # Publicamos (guardamos) el DataFrame final en la carpeta de salida
         guardar_archivos_finales(df, base_name, "Publicar")
+        if diario is not None:
+            diario.marcar_completado(clave, demo_mode)
+
+    except Exception as e:
+        print(Fore.RED + f"❌ ERROR procesando {file_path}: {e}")
+
+
+def process_csv_por_bloques(file_path, exclusiones, demo_mode=False, chunk_size=50000, diario=None):
+    """
+    Versión en streaming de process_csv:
+      - Lee el CSV en bloques de 'chunk_size' filas.
+      - Enriquece y normaliza cada bloque y lo añade a los CSV de salida.
+      - Al terminar, genera los Excel y las estadísticas a partir de lo publicado.
+    En memoria solo hay un bloque cada vez.
+    """
+    base_name = os.path.basename(file_path).replace(".csv", "")
+    print(Fore.YELLOW + f"📄 Procesando archivo por bloques de {chunk_size} filas: {file_path}")
+
+    try:
+        clave = clave_archivo(file_path)
+        if diario is not None and diario.archivo_completado(clave, demo_mode):
+            print(Fore.CYAN + f"⏩ {file_path} ya se publicó en la ejecución anterior. Saltando...")
+            return
+
+        salida = None
+        demo_restantes = DEMO_LIMIT if demo_mode else None
+        total_websites = 0
+        memoria_maxima = 0.0
+
+        for numero, bloque in enumerate(leer_csv(file_path, chunk_size), start=1):
+            if "website" not in bloque.columns:
+                print(Fore.RED + f"⚠ Archivo sin 'website'. Saltando...")
+                return
+            if salida is None:
+                salida = PublicacionIncremental(base_name, "Publicar")
+
+            memoria = memoria_mb(bloque)
+            memoria_maxima = max(memoria_maxima, memoria)
+            # Todas las filas comparten cabecera aunque un bloque no reciba resultados
+            preparar_columnas_enriquecimiento(bloque)
+
+            valid_websites = extraer_websites(bloque)
+            if demo_restantes is not None:
+                # En modo demo solo se enriquecen los 20 primeros registros del archivo
+                valid_websites = valid_websites[:demo_restantes]
+                demo_restantes -= len(valid_websites)
+
+            print(Fore.YELLOW + f"🔸 Bloque {numero}: {len(bloque)} filas, {len(valid_websites)} webs, "
+                                f"{memoria:.1f} MB.")
+            if valid_websites:
+                enriquecer(bloque, valid_websites, exclusiones, diario, clave)
+                total_websites += len(valid_websites)
+
+            salida.agregar(bloque)
+
+        if salida is None:
+            print(Fore.RED + "🚨 El archivo está vacío.")
+            return
+        if not total_websites:
+            print(Fore.RED + "🚨 No hay URLs válidas para procesar en este archivo.")
+        if demo_mode:
+            print(Fore.BLUE + f"🔹 Modo demo activado. Procesados {total_websites} registros.")
+        print(Fore.CYAN + f"🧮 {file_path}: bloque de mayor tamaño en memoria, {memoria_maxima:.1f} MB.")
+
+        rutas = salida.finalizar()
+        if diario is not None and rutas:
+            diario.marcar_completado(clave, demo_mode)
+        return rutas
 
     except Exception as e:
         print(Fore.RED + f"❌ ERROR procesando {file_path}: {e}")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import concurrent.futures
+import math
+import pandas as pd
+from colorama import Fore
+from dns_cache import DNS_LIFETIME, obtener_cache_dns
+from email_utils import validate_email_format
+
+# Resoluciones DNS simultáneas durante la validación en lote
+DNS_BATCH_WORKERS = 32
+# Tiempo máximo por dominio (segundos): consulta MX + consulta A y algo de margen.
+# El plazo total del lote crece con el número de dominios (ver plazo_resolucion).
+DNS_LOOKUP_TIMEOUT = 2 * DNS_LIFETIME + 2
+
+
+def separar_emails(valor):
+    """Convierte el contenido de una celda 'Emails' ("a@x.com, b@y.es") en lista."""
+    if pd.isna(valor):
+        return []
+    return [email.strip() for email in str(valor).split(",") if email.strip()]
+
+
+def plazo_resolucion(num_dominios, max_workers=DNS_BATCH_WORKERS, timeout=DNS_LOOKUP_TIMEOUT):
+    """Plazo total (segundos) para resolver 'num_dominios' con 'max_workers' consultas simultáneas."""
+    return timeout * max(1, math.ceil(num_dominios / max_workers))
+
+
+def resolver_dominios(dominios, consultar=None, max_workers=DNS_BATCH_WORKERS, timeout=DNS_LOOKUP_TIMEOUT):
+    """
+    Resuelve en paralelo un conjunto de dominios.
+
+    Args:
+        dominios (iterable): Dominios únicos a comprobar
+        consultar (callable): dominio -> (valido, mensaje). Por defecto, la caché DNS compartida.
+        max_workers (int): Consultas simultáneas
+        timeout (float): Tiempo máximo por dominio en segundos (el plazo total
+                         lo calcula plazo_resolucion)
+
+    Returns:
+        dict: {dominio: (valido, mensaje)}. Los dominios sin respuesta a tiempo
+              quedan como (None, mensaje): sin verificar, no como no válidos.
+    """
+    if consultar is None:
+        consultar = obtener_cache_dns().consultar
+
+    dominios = list(dominios)
+    veredictos = {}
+    if not dominios:
+        return veredictos
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    futures = {executor.submit(consultar, dominio): dominio for dominio in dominios}
+    plazo = plazo_resolucion(len(dominios), max_workers, timeout)
+    done, not_done = concurrent.futures.wait(futures, timeout=plazo)
+    for future in done:
+        dominio = futures[future]
+        try:
+            veredictos[dominio] = future.result()
+        except Exception as e:
+            veredictos[dominio] = (False, f"Error DNS: {e}")
+    for future in not_done:
+        future.cancel()
+        veredictos[futures[future]] = (None, "Tiempo de validación DNS agotado")
+    executor.shutdown(wait=False)
+    return veredictos
+
+
+def validar_emails_dataframe(df, columna="Emails", indices=None, consultar=None,
+                             max_workers=DNS_BATCH_WORKERS, timeout=DNS_LOOKUP_TIMEOUT):
+    """
+    Validación DNS en lote de todos los emails de un DataFrame:
+      1. Recoge los emails de la columna (separados por comas) de todas las filas indicadas.
+      2. Valida el formato y deduplica los dominios.
+      3. Resuelve los dominios en paralelo (una consulta por dominio).
+      4. Reescribe cada fila descartando los emails con dominio no válido; los de
+         dominios que no se pudieron resolver a tiempo se conservan.
+
+    Args:
+        df (pd.DataFrame): DataFrame con la columna de emails (se modifica in situ)
+        columna (str): Nombre de la columna de emails
+        indices (iterable): Filas a validar (por defecto, todas)
+        consultar (callable): dominio -> (valido, mensaje); permite usar un resolver de pruebas
+        max_workers (int): Consultas DNS simultáneas
+        timeout (float): Tiempo máximo por dominio en segundos
+
+    Returns:
+        dict: Resumen con emails revisados, dominios únicos, emails descartados
+              y emails conservados sin verificar.
+    """
+    resumen = {"emails": 0, "dominios": 0, "descartados": 0, "sin_verificar": 0}
+    if columna not in df.columns:
+        return resumen
+
+    serie = df[columna] if indices is None else df.loc[list(indices), columna]
+
+    emails_por_fila = {}
+    dominio_por_email = {}
+    for index, valor in serie.dropna().items():
+        emails = separar_emails(valor)
+        if not emails:
+            continue
+        emails_por_fila[index] = emails
+        for email in emails:
+            if email not in dominio_por_email:
+                is_valid, dominio = validate_email_format(email)
+                dominio_por_email[email] = dominio.lower() if is_valid else None
+
+    dominios = {dominio for dominio in dominio_por_email.values() if dominio}
+    print(Fore.YELLOW + f"📨 Validando DNS de {len(dominio_por_email)} emails ({len(dominios)} dominios únicos)...")
+    veredictos = resolver_dominios(dominios, consultar, max_workers, timeout)
+
+    descartados = 0
+    sin_verificar = 0
+    for index, emails in emails_por_fila.items():
+        validos = []
+        for email in emails:
+            dominio = dominio_por_email[email]
+            is_valid, msg = veredictos.get(dominio, (False, "Formato inválido"))
+            if is_valid:
+                validos.append(email)
+            elif is_valid is None:
+                # Sin respuesta DNS a tiempo: no hay motivo para borrarlo
+                validos.append(email)
+                sin_verificar += 1
+            else:
+                descartados += 1
+                print(Fore.RED + f"🚫 EMAIL INVÁLIDO ({msg}): {email}")
+        if len(validos) != len(emails):
+            df.at[index, columna] = ", ".join(validos)
+
+    if sin_verificar:
+        print(Fore.YELLOW + f"⏳ {sin_verificar} emails se conservan sin verificar (DNS sin respuesta a tiempo).")
+
+    resumen.update(emails=len(dominio_por_email), dominios=len(dominios), descartados=descartados,
+                   sin_verificar=sin_verificar)
+    return resumen
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+progreso.py
+
+Diario de progreso para reanudar una ejecución interrumpida.
+
+Es un archivo JSON Lines de solo escritura al final (PROGRESS_FILE) con un
+registro por línea:
+  {"tipo": "fila", "archivo": <clave>, "index": 123, "emails": [...], "social": {...}}
+  {"tipo": "archivo", "archivo": <clave>, "demo": false}     -> archivo terminado
+
+Cada línea se vuelca al sistema operativo al escribirla (sobrevive a la caída
+del proceso) y se hace fsync por lotes (FSYNC_EVERY líneas o FSYNC_INTERVAL
+segundos) para no pagar una escritura a disco por fila. Una última línea
+cortada por una caída se ignora al leer.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from configuracion import PROGRESS_FILE
+
+# fsync del diario cada FSYNC_EVERY filas o cada FSYNC_INTERVAL segundos
+FSYNC_EVERY = 100
+FSYNC_INTERVAL = 2.0
+
+
+def clave_archivo(file_path):
+    """
+    Identifica un CSV de entrada por nombre, tamaño y fecha de modificación:
+    si el archivo cambia, su progreso anterior deja de aplicarse.
+    """
+    info = os.stat(file_path)
+    return f"{os.path.basename(file_path)}:{info.st_size}:{int(info.st_mtime)}"
+
+
+class DiarioProgreso:
+    """
+    Registra las filas ya enriquecidas y los archivos terminados.
+    Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, ruta=PROGRESS_FILE, fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL):
+        self.ruta = ruta
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._filas = {}        # clave de archivo -> {index: (emails, social)}
+        self._completados = {}  # clave de archivo -> demo (bool)
+        self._archivo = None
+        self._sin_fsync = 0
+        self._ultimo_fsync = time.monotonic()
+        self._leer()
+        atexit.register(self.cerrar)
+
+    # ---------------------------------------------------------
+    # Lectura
+    # ---------------------------------------------------------
+    def _leer(self):
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    continue  # línea incompleta de una caída
+                if registro.get("tipo") == "fila":
+                    self._filas.setdefault(registro["archivo"], {})[registro["index"]] = (
+                        registro.get("emails", []), registro.get("social", {})
+                    )
+                elif registro.get("tipo") == "archivo":
+                    self._completados[registro["archivo"]] = registro.get("demo", False)
+
+    def hay_progreso(self):
+        """True si el diario contiene trabajo de una ejecución anterior."""
+        with self._lock:
+            return bool(self._filas or self._completados)
+
+    def resumen(self):
+        with self._lock:
+            return {
+                "archivos_completados": len(self._completados),
+                "filas": sum(len(filas) for filas in self._filas.values()),
+            }
+
+    def archivo_completado(self, clave, demo=False):
+        """True si el archivo se terminó en una ejecución anterior con el mismo modo."""
+        with self._lock:
+            return clave in self._completados and self._completados[clave] == demo
+
+    def filas_hechas(self, clave):
+        """Copia de {index: (emails, social)} con las filas ya enriquecidas del archivo."""
+        with self._lock:
+            return dict(self._filas.get(clave, {}))
+
+    # ---------------------------------------------------------
+    # Escritura
+    # ---------------------------------------------------------
+    def _escribir(self, registro, forzar_fsync=False):
+        # Se llama con el lock tomado
+        if self._archivo is None:
+            self._archivo = open(self.ruta, "a", encoding="utf-8")
+        self._archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self._archivo.flush()
+        self._sin_fsync += 1
+        if (forzar_fsync or self._sin_fsync >= self.fsync_every
+                or time.monotonic() - self._ultimo_fsync >= self.fsync_interval):
+            self._fsync()
+
+    def _fsync(self):
+        # Se llama con el lock tomado
+        if self._archivo is not None and self._sin_fsync:
+            os.fsync(self._archivo.fileno())
+        self._sin_fsync = 0
+        self._ultimo_fsync = time.monotonic()
+
+    def registrar_fila(self, clave, index, emails, social):
+        """Anota una fila enriquecida con el resultado de la API."""
+        index = int(index)
+        with self._lock:
+            self._filas.setdefault(clave, {})[index] = (list(emails), dict(social))
+            self._escribir({"tipo": "fila", "archivo": clave, "index": index,
+                            "emails": list(emails), "social": dict(social)})
+
+    def marcar_completado(self, clave, demo=False):
+        """Anota que el archivo se publicó entero (se fuerza el fsync)."""
+        with self._lock:
+            self._completados[clave] = demo
+            self._escribir({"tipo": "archivo", "archivo": clave, "demo": demo}, forzar_fsync=True)
+
+    def reiniciar(self):
+        """Descarta todo el progreso anterior."""
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+            if os.path.exists(self.ruta):
+                os.remove(self.ruta)
+            self._filas = {}
+            self._completados = {}
+            self._sin_fsync = 0
+
+    def cerrar(self):
+        """Hace fsync de lo pendiente y cierra el diario."""
+        with self._lock:
+            if self._archivo is not None:
+                self._fsync()
+                self._archivo.close()
+                self._archivo = None
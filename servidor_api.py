@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+servidor_api.py
+
+Servidor de referencia de la API de emails y redes sociales, para ejecutarla
+en local y probar el cliente (crawler_api_php.py) sin depender del servidor PHP.
+
+Endpoints (mismo formato de respuesta que la API PHP):
+  GET  /apiemailsocial.php?domain=<dominio>
+       -> {"error": false, "emails": [...], "social_links": {...}}
+  POST /apiemailsocial_batch.php   con cuerpo {"domains": ["a.com", "b.es", ...]}
+       -> {"results": {"a.com": {...}, "b.es": {"error": true, "message": ...}}}
+
+En el endpoint de lotes cada dominio lleva su propia respuesta: si uno falla,
+el resto se devuelve igualmente. Los dominios de un lote se rastrean a la vez
+con crawler.process_domains (un solo límite global de descargas).
+
+Uso:
+    python servidor_api.py [puerto]
+y en el cliente:
+    configurar_cliente_api("http://127.0.0.1:8080/apiemailsocial.php")
+"""
+
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from colorama import Fore, init
+from crawler import process_domain, process_domains
+
+API_SERVER_HOST = "127.0.0.1"
+API_SERVER_PORT = 8080
+API_BATCH_MAX_DOMAINS = 200            # dominios máximos por petición de lote
+API_MAX_BODY_SIZE = 1024 * 1024        # bytes máximos del cuerpo de una petición de lote
+
+
+class ManejadorAPI(BaseHTTPRequestHandler):
+    """Atiende los dos endpoints; las funciones de rastreo las fija crear_servidor."""
+
+    procesar_dominio = staticmethod(process_domain)
+    procesar_dominios = staticmethod(process_domains)
+
+    def _responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.endswith("/apiemailsocial.php"):
+            self._responder(404, {"error": True, "message": "Endpoint desconocido"})
+            return
+        domain = parse_qs(url.query).get("domain", [""])[0].strip()
+        if not domain:
+            self._responder(400, {"error": True, "message": "Falta el parámetro 'domain'"})
+            return
+        try:
+            resultado = self.procesar_dominio(domain)
+        except Exception as e:
+            resultado = {"error": True, "message": str(e)}
+        self._responder(200, resultado)
+
+    def do_POST(self):
+        if not urlparse(self.path).path.endswith("/apiemailsocial_batch.php"):
+            self._responder(404, {"error": True, "message": "Endpoint desconocido"})
+            return
+        longitud = int(self.headers.get("Content-Length") or 0)
+        if longitud > API_MAX_BODY_SIZE:
+            self._responder(413, {"error": True, "message": "Cuerpo demasiado grande"})
+            return
+        try:
+            domains = json.loads(self.rfile.read(longitud) or b"{}").get("domains")
+        except (ValueError, AttributeError):
+            domains = None
+        if not isinstance(domains, list) or not all(isinstance(d, str) for d in domains):
+            self._responder(400, {"error": True, "message": "Se esperaba {\"domains\": [...]}"})
+            return
+        if len(domains) > API_BATCH_MAX_DOMAINS:
+            self._responder(413, {"error": True,
+                                  "message": f"Máximo {API_BATCH_MAX_DOMAINS} dominios por lote"})
+            return
+
+        domains = [d.strip() for d in dict.fromkeys(domains) if d.strip()]
+        try:
+            resultados = self.procesar_dominios(domains) if domains else {}
+        except Exception as e:
+            # Fallo del lote entero: cada dominio recibe el error por separado
+            resultados = {domain: {"error": True, "message": str(e)} for domain in domains}
+        self._responder(200, {"results": resultados})
+
+    def log_message(self, formato, *args):
+        print(Fore.CYAN + f"🛰 {self.address_string()} {formato % args}")
+
+
+def crear_servidor(host=API_SERVER_HOST, puerto=API_SERVER_PORT,
+                   procesar_dominio=process_domain, procesar_dominios=process_domains):
+    """
+    Crea (sin arrancarlo) el servidor de referencia. Las funciones de rastreo
+    se pueden sustituir, p. ej. para probar el cliente sin salir a Internet.
+    Con puerto=0 el sistema elige uno libre (ver servidor.server_address).
+    """
+    manejador = type("ManejadorAPIConfigurado", (ManejadorAPI,), {
+        "procesar_dominio": staticmethod(procesar_dominio),
+        "procesar_dominios": staticmethod(procesar_dominios),
+    })
+    servidor = ThreadingHTTPServer((host, puerto), manejador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def main():
+    init(autoreset=True)
+    puerto = int(sys.argv[1]) if len(sys.argv) > 1 else API_SERVER_PORT
+    servidor = crear_servidor(puerto=puerto)
+    host, puerto = servidor.server_address[:2]
+    print(Fore.GREEN + f"🚀 API de referencia escuchando en http://{host}:{puerto}/apiemailsocial.php "
+                       f"(lotes: /apiemailsocial_batch.php)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print(Fore.YELLOW + "\n🛑 Servidor detenido.")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()